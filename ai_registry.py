@@ -0,0 +1,127 @@
+import time
+import logging
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Component states
+UNINITIALIZED = 'uninitialized'
+INITIALIZING = 'initializing'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class LazyComponent:
+    """A component that is built on first use, exactly once, behind a lock"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], retry_interval: float = 60.0):
+        self.name = name
+        self.factory = factory
+        self.retry_interval = retry_interval
+        self.state = UNINITIALIZED
+        self.value = None
+        self.error: Optional[str] = None
+        self.initialized_at: Optional[float] = None
+        self.init_duration: Optional[float] = None
+        self.attempts = 0
+        self._failed_at = 0.0
+        # threading.Lock is greenlet-aware once gevent has monkey patched the process
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """Return the component, initializing it if this is the first use"""
+        if self.state == READY:
+            return self.value
+
+        with self._lock:
+            if self.state == READY:
+                return self.value
+
+            # Don't hammer a failing dependency on every request
+            if self.state == FAILED and time.monotonic() - self._failed_at < self.retry_interval:
+                return None
+
+            self.state = INITIALIZING
+            self.attempts += 1
+            started = time.monotonic()
+            try:
+                value = self.factory()
+                if value is None:
+                    raise ValueError(f"{self.name} factory returned nothing")
+            except Exception as e:
+                logger.error(f"Error initializing {self.name}: {str(e)}")
+                logger.debug(traceback.format_exc())
+                self.state = FAILED
+                self.error = str(e)
+                self._failed_at = time.monotonic()
+                return None
+
+            self.value = value
+            self.error = None
+            self.init_duration = time.monotonic() - started
+            self.initialized_at = time.time()
+            self.state = READY
+            logger.info(f"{self.name} initialized in {self.init_duration:.2f}s")
+            return value
+
+    def reset(self):
+        """Forget the current value so the next get() rebuilds it"""
+        with self._lock:
+            self.state = UNINITIALIZED
+            self.value = None
+            self.error = None
+            self._failed_at = 0.0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'error': self.error,
+            'attempts': self.attempts,
+            'initialized_at': self.initialized_at,
+            'init_duration': self.init_duration
+        }
+
+
+class AIComponentRegistry:
+    """Process-wide registry of lazily initialized AI components"""
+
+    def __init__(self):
+        self._components: Dict[str, LazyComponent] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], retry_interval: float = 60.0) -> LazyComponent:
+        component = LazyComponent(name, factory, retry_interval)
+        self._components[name] = component
+        return component
+
+    def get(self, name: str) -> Any:
+        return self._components[name].get()
+
+    def is_ready(self, name: str) -> bool:
+        return self._components[name].state == READY
+
+    def initialize_all(self) -> bool:
+        """Eagerly initialize every component; True if all of them are ready"""
+        return all([component.get() is not None for component in self._components.values()])
+
+    def reset(self, name: Optional[str] = None):
+        components = [self._components[name]] if name else self._components.values()
+        for component in components:
+            component.reset()
+
+    def retry_failed(self) -> bool:
+        """Retry any component whose last initialization failed"""
+        for component in self._components.values():
+            if component.state == FAILED:
+                component.reset()
+                component.get()
+        return all(component.state == READY for component in self._components.values())
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: component.status() for name, component in self._components.items()}
+
+
+# Shared registry instance
+ai_components = AIComponentRegistry()
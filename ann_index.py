@@ -0,0 +1,180 @@
+import os
+import re
+import math
+import logging
+from typing import FrozenSet, Optional, Tuple
+
+import numpy as np
+import faiss
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# 'auto' picks by corpus size and memory budget; anything else is a FAISS
+# index_factory string used as-is (e.g. 'Flat', 'HNSW32', 'IVF1024,SQ8', 'IVF4096,PQ48')
+VECTOR_INDEX_TYPE = os.getenv('VECTOR_INDEX_TYPE', 'auto')
+# Covers the global index and its role partitions together
+VECTOR_INDEX_MEMORY_MB = float(os.getenv('VECTOR_INDEX_MEMORY_MB', 1024))
+# Exact search is both fastest to build and fast enough up to here
+VECTOR_FLAT_MAX = int(os.getenv('VECTOR_FLAT_MAX', 20000))
+VECTOR_HNSW_M = int(os.getenv('VECTOR_HNSW_M', 32))
+VECTOR_EF_CONSTRUCTION = int(os.getenv('VECTOR_EF_CONSTRUCTION', 80))
+
+# Search-time accuracy/latency knobs
+VECTOR_NPROBE = int(os.getenv('VECTOR_NPROBE', 16))
+VECTOR_EF_SEARCH = int(os.getenv('VECTOR_EF_SEARCH', 64))
+
+# Per-vector bookkeeping of IndexIDMap2 (id array plus reverse map entry)
+_ID_OVERHEAD = 48
+_IVF_PATTERN = re.compile(r'IVF(\d+)')
+_PQ_PATTERN = re.compile(r'PQ(\d+)')
+_MAX_TRAINING_POINTS = 100000
+
+
+def ivf_nlist(count: int) -> int:
+    """Number of IVF lists for a corpus, keeping ~39+ training points per list"""
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def pq_subquantizers(dimension: int) -> int:
+    """Largest PQ code size with at least 8 dimensions per sub-quantizer"""
+    for m in range(max(1, dimension // 8), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def estimated_bytes(spec: str, count: int, dimension: int) -> int:
+    """Rough resident size of an index of this type"""
+    if spec.startswith('HNSW'):
+        m = int(re.match(r'HNSW(\d+)', spec).group(1))
+        code = dimension if 'SQ8' in spec else 4 * dimension
+        # Level 0 keeps 2*M neighbours; upper levels add about 1/M of that
+        per_vector = code + 2 * m * 4 * (1 + 1 / m)
+    elif 'PQ' in spec:
+        per_vector = int(_PQ_PATTERN.search(spec).group(1)) + 8
+    elif 'SQ8' in spec:
+        per_vector = dimension + 8
+    else:
+        per_vector = 4 * dimension + (8 if 'IVF' in spec else 0)
+    return int(count * (per_vector + _ID_OVERHEAD))
+
+
+def choose_index_spec(count: int, dimension: int, budget_bytes: Optional[float] = None,
+                      index_type: str = VECTOR_INDEX_TYPE) -> str:
+    """Index factory string for a corpus of count vectors.
+
+    Small corpora get an exact flat index. Larger ones get HNSW if it fits
+    the memory budget, else IVF with 8-bit scalar quantization, else IVF with
+    product quantization.
+    """
+    if index_type != 'auto':
+        return index_type
+    if budget_bytes is None:
+        budget_bytes = VECTOR_INDEX_MEMORY_MB * 2 ** 20
+
+    if count <= VECTOR_FLAT_MAX and estimated_bytes('Flat', count, dimension) <= budget_bytes:
+        return 'Flat'
+
+    nlist = ivf_nlist(count)
+    candidates = [
+        f"HNSW{VECTOR_HNSW_M}",
+        f"IVF{nlist},SQ8",
+        f"IVF{nlist},PQ{pq_subquantizers(dimension)}",
+    ]
+    for spec in candidates:
+        if estimated_bytes(spec, count, dimension) <= budget_bytes:
+            return spec
+
+    logger.warning(f"No index type fits {budget_bytes / 2 ** 20:.0f} MB for {count} vectors, using {candidates[-1]}")
+    return candidates[-1]
+
+
+def _min_training_points(spec: str) -> int:
+    needed = 1
+    match = _IVF_PATTERN.search(spec)
+    if match:
+        needed = int(match.group(1))
+    if 'PQ' in spec:
+        needed = max(needed, 256)
+    return needed
+
+
+def build_index(spec: str, vectors: np.ndarray, ids: np.ndarray) -> Tuple[faiss.Index, str]:
+    """Build an id-mapped index of the given type; returns the index and the type actually used"""
+    dimension = vectors.shape[1]
+    if spec != 'Flat' and len(vectors) < _min_training_points(spec):
+        logger.warning(f"Too few vectors ({len(vectors)}) to train {spec}, using an exact index")
+        spec = 'Flat'
+
+    inner = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+    concrete = faiss.downcast_index(inner)
+    if isinstance(concrete, faiss.IndexHNSW):
+        concrete.hnsw.efConstruction = VECTOR_EF_CONSTRUCTION
+    if not inner.is_trained:
+        # A fixed-seed sample keeps training time bounded and builds reproducible
+        sample = vectors
+        if len(vectors) > _MAX_TRAINING_POINTS:
+            rows = np.random.default_rng(0).choice(len(vectors), _MAX_TRAINING_POINTS, replace=False)
+            sample = np.ascontiguousarray(vectors[np.sort(rows)])
+        inner.train(sample)
+
+    index = faiss.IndexIDMap2(inner)
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index, spec
+
+
+def search_params(index, k: int, exclude: FrozenSet[int] = frozenset(), nprobe: Optional[int] = None,
+                  ef_search: Optional[int] = None) -> Optional[faiss.SearchParameters]:
+    """Per-search parameters: accuracy knobs for the index type, plus an id filter.
+
+    Excluded ids are filtered inside FAISS's own top-k selection. nprobe and
+    ef_search default to VECTOR_NPROBE and VECTOR_EF_SEARCH.
+    """
+    kwargs = {}
+    if exclude:
+        ids = np.fromiter(exclude, dtype='int64', count=len(exclude))
+        kwargs['sel'] = faiss.IDSelectorNot(faiss.IDSelectorBatch(ids))
+
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=nprobe or VECTOR_NPROBE, **kwargs)
+    if isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=max(ef_search or VECTOR_EF_SEARCH, k), **kwargs)
+    return faiss.SearchParameters(**kwargs) if kwargs else None
+
+
+def _remaining(index, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Ids and vectors left in an id-mapped index once ids are removed, in id_map order"""
+    all_ids = faiss.vector_to_array(index.id_map)
+    keep = ~np.isin(all_ids, ids)
+    vectors = index.index.reconstruct_n(0, index.ntotal)[keep]
+    return all_ids[keep], np.ascontiguousarray(vectors, dtype='float32')
+
+
+def remove_ids(index, ids, spec: str):
+    """Remove ids, returning the (possibly new) index.
+
+    HNSW graphs can't drop nodes, so those are rebuilt from the remaining
+    vectors instead. IVF indexes compact their lists on removal without
+    IndexIDMap2's id map following, which would pair every later result with
+    the wrong id, so the remaining vectors are re-added to an emptied copy
+    of the trained index (no retraining).
+    """
+    ids = np.asarray(ids, dtype='int64')
+    if isinstance(faiss.downcast_index(index.index), faiss.IndexIVF):
+        remaining_ids, vectors = _remaining(index, ids)
+        inner = faiss.clone_index(index.index)
+        inner.reset()
+        rebuilt = faiss.IndexIDMap2(inner)
+        if len(vectors):
+            rebuilt.add_with_ids(vectors, remaining_ids)
+        return rebuilt
+
+    try:
+        index.remove_ids(faiss.IDSelectorBatch(ids))
+        return index
+    except RuntimeError:
+        remaining_ids, vectors = _remaining(index, ids)
+        return build_index(spec, vectors, remaining_ids)[0]
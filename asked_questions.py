@@ -0,0 +1,130 @@
+import os
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ASKED_MAX_ROOMS = int(os.getenv('ASKED_MAX_ROOMS', 1000))
+# Once a room has seen this many questions its history starts over
+ASKED_MAX_PER_ROOM = int(os.getenv('ASKED_MAX_PER_ROOM', 256))
+# The ordinal table is never renumbered below this many ids
+_COMPACT_MIN = 4096
+
+
+class AskedQuestionTracker:
+    """Per-room record of the questions already put to a room.
+
+    Each room is a bitset (a Python int) over ordinals that are assigned to
+    stable question ids, process-wide, the first time any room marks them.
+    A room's int is as wide as the highest ordinal it holds, so the ordinal
+    table is kept to the ids rooms actually hold: once it has grown to twice
+    that many (ids of evicted rooms, questions gone from the catalog), the
+    live ids are renumbered from zero. Only questions actually asked or
+    selected are marked. Rooms are released on teardown, and least recently
+    used first beyond ASKED_MAX_ROOMS. Only touched from greenlets on the
+    hub, so no locking is needed.
+    """
+
+    def __init__(self, max_rooms: int = ASKED_MAX_ROOMS, max_per_room: int = ASKED_MAX_PER_ROOM):
+        self.max_rooms = max_rooms
+        self.max_per_room = max_per_room
+        # question id <-> ordinal; append-only so ordinals never move
+        self._ordinals: Dict[int, int] = {}
+        self._ids: List[int] = []
+        # Size of the ordinal table at which it is next compacted
+        self._compact_at = _COMPACT_MIN
+        # room id -> (bitset, count, id of the question currently being asked)
+        self._rooms: "OrderedDict[str, tuple]" = OrderedDict()
+        self.marked = 0
+        self.resets = 0
+        self.compactions = 0
+
+    def _ordinal(self, qid: int) -> int:
+        ordinal = self._ordinals.get(qid)
+        if ordinal is None:
+            ordinal = self._ordinals[qid] = len(self._ids)
+            self._ids.append(qid)
+        return ordinal
+
+    def _qids(self, bits: int) -> List[int]:
+        qids = []
+        while bits:
+            lowest = bits & -bits
+            qids.append(self._ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return qids
+
+    def _compact(self):
+        """Renumber ordinals to just the ids rooms still hold"""
+        rooms = [(room_id, self._qids(bits), count, current_id)
+                 for room_id, (bits, count, current_id) in self._rooms.items()]
+        self._ordinals = {}
+        self._ids = []
+        self._rooms = OrderedDict()
+        for room_id, qids, count, current_id in rooms:
+            bits = 0
+            for qid in qids:
+                bits |= 1 << self._ordinal(qid)
+            self._rooms[room_id] = (bits, count, current_id)
+        self._compact_at = max(_COMPACT_MIN, 2 * len(self._ids))
+        self.compactions += 1
+
+    def mark(self, room_id: str, qids: Iterable[int], current: bool = False):
+        """Record questions as asked in a room.
+
+        With current=True the last of them becomes the room's current
+        question, the one follow-ups are suggested for; suggestions that were
+        only shown leave it unchanged.
+        """
+        if not room_id:
+            return
+        if len(self._ids) >= self._compact_at:
+            self._compact()
+
+        bits, count, current_id = self._rooms.pop(room_id, (0, 0, None))
+        for qid in qids:
+            if current:
+                current_id = qid
+            bit = 1 << self._ordinal(qid)
+            if bits & bit:
+                continue
+            if count >= self.max_per_room:
+                # The room has been through most of what it could be asked
+                bits, count = 0, 0
+                self.resets += 1
+            bits |= bit
+            count += 1
+            self.marked += 1
+
+        self._rooms[room_id] = (bits, count, current_id)
+        while len(self._rooms) > self.max_rooms:
+            self._rooms.popitem(last=False)
+
+    def excluded(self, room_id: str) -> FrozenSet[int]:
+        """Ids of the questions already asked in a room"""
+        return frozenset(self._qids(self._rooms.get(room_id, (0, 0, None))[0]))
+
+    def current(self, room_id: str) -> Optional[int]:
+        """Id of the question most recently asked in a room, if any"""
+        return self._rooms.get(room_id, (0, 0, None))[2]
+
+    def evict(self, room_id: str):
+        self._rooms.pop(room_id, None)
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rooms': len(self._rooms),
+            'known_questions': len(self._ids),
+            'marked': self.marked,
+            'resets': self.resets,
+            'compactions': self.compactions
+        }
+
+
+# Shared per-room asked-question state
+asked_questions = AskedQuestionTracker()
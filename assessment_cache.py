@@ -0,0 +1,109 @@
+import os
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from embedding_cache import ByteBoundedLRUCache, normalize_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ASSESSMENT_CACHE_MAX_BYTES = int(os.getenv('ASSESSMENT_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+# How long an assessment is reused, in both tiers
+ASSESSMENT_CACHE_TTL = float(os.getenv('ASSESSMENT_CACHE_TTL', 7 * 24 * 3600))
+ASSESSMENT_CACHE_COLLECTION = os.getenv('ASSESSMENT_CACHE_COLLECTION', 'assessment_cache')
+
+
+def assessment_key(role: str, question: str, answer: str, prompt_version: Any) -> str:
+    """Cache key for an assessment.
+
+    Answers are compared case- and whitespace-insensitively, so a
+    resubmission or the same canned answer from another user hits the cache.
+    """
+    raw = '\x1f'.join((str(prompt_version), role.strip(), normalize_text(question), normalize_text(answer)))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AssessmentCache:
+    """Two-tier assessment cache: an in-process LRU in front of a Mongo collection.
+
+    The Mongo tier is shared by every worker process and survives restarts;
+    a TTL index on created_at expires its entries. Mongo errors are logged
+    and treated as misses, so the cache never fails an assessment. Each entry
+    keeps the LLM latency it cost, which hits report as saved.
+    """
+
+    def __init__(self, max_bytes: int = ASSESSMENT_CACHE_MAX_BYTES, ttl: float = ASSESSMENT_CACHE_TTL):
+        self.ttl = ttl
+        self._memory = ByteBoundedLRUCache(max_bytes, ttl, name='assessments')
+        self._collection = None
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.saved_llm_seconds = 0.0
+
+    def attach(self, collection):
+        """Use a Mongo collection as the shared tier, creating its TTL index"""
+        try:
+            collection.create_index('created_at', expireAfterSeconds=int(self.ttl))
+            self._collection = collection
+        except Exception as e:
+            logger.error(f"Assessment cache running without Mongo tier: {e}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached assessment for key, or None"""
+        entry = self._memory.get(key)
+        if entry is None and self._collection is not None:
+            try:
+                document = self._collection.find_one({'_id': key})
+            except Exception as e:
+                logger.error(f"Assessment cache lookup failed: {e}")
+                document = None
+            if document is not None:
+                entry = (document['assessment'], document.get('llm_seconds', 0.0))
+                self._memory.put(key, entry)
+                self.mongo_hits += 1
+        elif entry is not None:
+            self.memory_hits += 1
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        assessment, llm_seconds = entry
+        self.saved_llm_seconds += llm_seconds
+        return dict(assessment)
+
+    def put(self, key: str, assessment: Dict[str, Any], llm_seconds: float, prompt_version: Any = None):
+        """Store an assessment and how long the LLM took to produce it"""
+        self._memory.put(key, (dict(assessment), llm_seconds))
+        if self._collection is None:
+            return
+        try:
+            self._collection.replace_one({'_id': key}, {
+                '_id': key,
+                'assessment': assessment,
+                'llm_seconds': llm_seconds,
+                'prompt_version': prompt_version,
+                'created_at': datetime.now(timezone.utc)
+            }, upsert=True)
+        except Exception as e:
+            logger.error(f"Assessment cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.mongo_hits
+        lookups = hits + self.misses
+        return {
+            'memory': self._memory.stats(),
+            'mongo': self._collection is not None,
+            'memory_hits': self.memory_hits,
+            'mongo_hits': self.mongo_hits,
+            'misses': self.misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'saved_llm_seconds': round(self.saved_llm_seconds, 3)
+        }
+
+
+# Shared assessment cache
+assessment_cache = AssessmentCache()
@@ -0,0 +1,326 @@
+import os
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import gevent
+from gevent.queue import Queue
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Assessments run concurrently; the rest wait in the queue
+ASSESSMENT_WORKERS = int(os.getenv('ASSESSMENT_WORKERS', 4))
+# Jobs accepted beyond this many queued are refused instead of piling up
+ASSESSMENT_QUEUE_MAX = int(os.getenv('ASSESSMENT_QUEUE_MAX', 1000))
+ASSESSMENT_JOB_COLLECTION = os.getenv('ASSESSMENT_JOB_COLLECTION', 'assessment_jobs')
+# Finished jobs are kept this long for polling, then expire
+ASSESSMENT_JOB_TTL = int(os.getenv('ASSESSMENT_JOB_TTL', 24 * 3600))
+# A running job holds a lease this long, renewed while its worker is alive;
+# jobs whose lease has expired (their process died) are requeued by a sweep
+# that runs at the same interval
+ASSESSMENT_JOB_LEASE_SECONDS = float(os.getenv('ASSESSMENT_JOB_LEASE_SECONDS', 60))
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class QueueFull(Exception):
+    """The assessment queue is at ASSESSMENT_QUEUE_MAX"""
+
+
+class RetryLater(Exception):
+    """Raised by a runner that can't run the job yet (e.g. Gemini is down); it is requeued after delay"""
+
+    def __init__(self, delay: float):
+        super().__init__(f"Retry in {delay:.0f}s")
+        self.delay = delay
+
+
+class _Timing:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'mean_ms': round(self.total / self.count * 1000.0, 1) if self.count else 0.0,
+            'max_ms': round(self.max * 1000.0, 1)
+        }
+
+
+class AssessmentJobQueue:
+    """Answer assessments run in the background by a fixed pool of greenlets.
+
+    Each job is a document in Mongo before it is queued, so jobs accepted by a
+    process that restarts are picked up again by recover(). Workers claim a
+    job by flipping its status from queued to running, so a job is never run
+    twice even when several processes recover the same backlog. A running
+    job holds a lease its worker keeps renewing; if the worker's process dies
+    the lease runs out and a periodic sweep (in any process) requeues it.
+    Each claim gets its own lease token and attempt number, and a worker's
+    writes only apply while it still holds that claim, so a worker that lost
+    its job to a requeue can't overwrite or re-announce the result. Runners
+    may see the same job again after such a requeue and should record their
+    side effects idempotently (keyed by the job id). The runner
+    does the actual assessment, and may raise RetryLater to put the job back
+    for a while; notify is called with the finished job document (done or
+    failed) to push the result to the user.
+    """
+
+    def __init__(self, workers: int = ASSESSMENT_WORKERS, max_queued: int = ASSESSMENT_QUEUE_MAX,
+                 ttl: int = ASSESSMENT_JOB_TTL, lease: float = ASSESSMENT_JOB_LEASE_SECONDS):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.lease = max(1.0, lease)
+        self._queue: Queue = Queue()
+        self._collection = None
+        self._runner: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+        self._notify: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._greenlets = []
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.deferred = 0
+        self.expired = 0
+        self.superseded = 0
+        self.wait_time = _Timing()
+        self.run_time = _Timing()
+
+    def start(self, collection, runner: Callable[[Dict[str, Any]], Dict[str, Any]],
+              notify: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Attach the job collection, requeue unfinished jobs and start the workers"""
+        self._collection = collection
+        self._runner = runner
+        self._notify = notify
+        try:
+            collection.create_index('finished_at', expireAfterSeconds=self.ttl)
+            collection.create_index([('status', 1), ('created_at', 1)])
+            collection.create_index([('status', 1), ('locked_until', 1)])
+        except Exception as e:
+            logger.error(f"Could not create assessment job indexes: {e}")
+
+        self.recover()
+        self._greenlets = [gevent.spawn(self._work) for _ in range(self.workers)]
+        self._greenlets.append(gevent.spawn(self._sweep))
+
+    def recover(self) -> int:
+        """Queue jobs left unfinished by a previous run; returns how many"""
+        try:
+            self._release_expired()
+            pending = list(self._collection.find({'status': QUEUED}, {'_id': 1}).sort('created_at', 1))
+        except Exception as e:
+            logger.error(f"Could not recover assessment jobs: {e}")
+            return 0
+
+        for job in pending:
+            self._queue.put(job['_id'])
+        if pending:
+            logger.info(f"Requeued {len(pending)} unfinished assessment jobs")
+        return len(pending)
+
+    def _release_expired(self) -> List[Any]:
+        """Put running jobs whose lease has run out back to queued; returns their ids"""
+        # Jobs from before leases were recorded have no locked_until and count as expired
+        expired = {'status': RUNNING, '$or': [{'locked_until': {'$lt': datetime.now(timezone.utc)}},
+                                              {'locked_until': None}]}
+        job_ids = [job['_id'] for job in self._collection.find(expired, {'_id': 1})]
+        if job_ids:
+            expired['_id'] = {'$in': job_ids}
+            self._collection.update_many(expired, {'$set': {'status': QUEUED, 'runnable_at': datetime.now(timezone.utc)},
+                                                   '$unset': {'started_at': '', 'locked_until': '', 'lease': ''}})
+            self.expired += len(job_ids)
+        return job_ids
+
+    def _sweep(self):
+        """Requeue jobs abandoned by a worker that died, without waiting for a restart"""
+        while True:
+            gevent.sleep(self.lease)
+            try:
+                job_ids = self._release_expired()
+            except Exception as e:
+                logger.error(f"Could not sweep expired assessment jobs: {e}")
+                continue
+            for job_id in job_ids:
+                self._queue.put(job_id)
+            if job_ids:
+                logger.warning(f"Requeued {len(job_ids)} assessment jobs whose lease expired")
+
+    def submit(self, user_id: str, role: str, question: str, answer: str) -> str:
+        """Persist and queue an assessment; returns the job id"""
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull(f"Assessment queue is full ({self.max_queued} jobs waiting)")
+
+        now = datetime.now(timezone.utc)
+        job = {
+            'user_id': user_id,
+            'role': role,
+            'question': question,
+            'answer': answer,
+            'status': QUEUED,
+            'attempts': 0,
+            'created_at': now,
+            # When the job last became runnable; queue wait is measured from here
+            'runnable_at': now
+        }
+        job_id = self._collection.insert_one(job).inserted_id
+        self.submitted += 1
+        self._queue.put(job_id)
+        return str(job_id)
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Public view of a job (owned by user_id, if given), or None"""
+        try:
+            query = {'_id': ObjectId(job_id)}
+        except (InvalidId, TypeError):
+            return None
+        if user_id is not None:
+            query['user_id'] = user_id
+        job = self._collection.find_one(query)
+        return self.public(job) if job else None
+
+    @staticmethod
+    def public(job: Dict[str, Any]) -> Dict[str, Any]:
+        view = {'job_id': str(job['_id']), 'status': job['status']}
+        if job['status'] == DONE:
+            view['assessment'] = job['result']
+            view['cached'] = job.get('cached', False)
+        elif job['status'] == FAILED:
+            view['error'] = job.get('error')
+        return view
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"Assessment worker error for job {job_id}: {e}")
+
+    def _claim(self, job_id) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return self._collection.find_one_and_update(
+            {'_id': job_id, 'status': QUEUED},
+            {'$set': {'status': RUNNING, 'started_at': now, 'locked_until': now + timedelta(seconds=self.lease),
+                      'lease': ObjectId()},
+             '$inc': {'attempts': 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _held(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Filter matching the job only while this claim of it still holds the lease"""
+        return {'_id': job['_id'], 'status': RUNNING, 'lease': job['lease'], 'attempts': job['attempts']}
+
+    def _renew(self, job: Dict[str, Any]):
+        """Keep extending a running job's lease until killed"""
+        while True:
+            gevent.sleep(self.lease / 3.0)
+            try:
+                self._collection.update_one(
+                    self._held(job),
+                    {'$set': {'locked_until': datetime.now(timezone.utc) + timedelta(seconds=self.lease)}}
+                )
+            except Exception as e:
+                logger.error(f"Could not renew lease of assessment job {job_id}: {e}")
+
+    def _run(self, job_id):
+        job = self._claim(job_id)
+        if job is None:
+            # Already claimed by another process, or gone
+            return
+
+        # Mongo hands back naive UTC datetimes; time spent deferred on purpose doesn't count
+        runnable_at = job.get('runnable_at') or job['created_at']
+        waited = job['started_at'].replace(tzinfo=None) - runnable_at.replace(tzinfo=None)
+        self.wait_time.add(max(0.0, waited.total_seconds()))
+
+        self.running += 1
+        started = time.perf_counter()
+        heartbeat = gevent.spawn(self._renew, job)
+        try:
+            result = self._runner(job)
+            update = {'status': DONE, 'result': result['assessment'], 'cached': result.get('cached', False)}
+            self.completed += 1
+        except RetryLater as e:
+            self._defer(job, e.delay)
+            return
+        except Exception as e:
+            logger.error(f"Assessment job {job_id} failed: {e}")
+            update = {'status': FAILED, 'error': str(e)}
+            self.failed += 1
+        finally:
+            heartbeat.kill()
+            self.running -= 1
+            self.run_time.add(time.perf_counter() - started)
+
+        update['finished_at'] = datetime.now(timezone.utc)
+        job.update(update)
+        try:
+            result = self._collection.update_one(self._held(job),
+                                                 {'$set': update, '$unset': {'locked_until': '', 'lease': ''}})
+        except Exception as e:
+            logger.error(f"Could not record assessment job {job_id}: {e}")
+        else:
+            if not result.matched_count:
+                # The lease ran out and the job was requeued; its new run owns the result
+                self.superseded += 1
+                logger.warning(f"Assessment job {job_id} lost its lease before finishing, dropping this run's result")
+                return
+
+        if self._notify is not None:
+            try:
+                self._notify(job)
+            except Exception as e:
+                logger.error(f"Could not push assessment job {job_id}: {e}")
+
+    def _defer(self, job: Dict[str, Any], delay: float):
+        job_id = job['_id']
+        delay = max(1.0, delay)
+        self.deferred += 1
+        try:
+            result = self._collection.update_one(
+                self._held(job),
+                {'$set': {'status': QUEUED, 'runnable_at': datetime.now(timezone.utc) + timedelta(seconds=delay)},
+                 '$unset': {'started_at': '', 'locked_until': '', 'lease': ''}}
+            )
+        except Exception as e:
+            logger.error(f"Could not requeue assessment job {job_id}: {e}")
+            return
+        if result.matched_count:
+            gevent.spawn_later(delay, self._queue.put, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'running': self.running,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'deferred': self.deferred,
+            'expired': self.expired,
+            'superseded': self.superseded,
+            'wait_time': self.wait_time.stats(),
+            'run_time': self.run_time.stats()
+        }
+
+
+# Shared assessment job queue
+assessment_jobs = AssessmentJobQueue()
@@ -0,0 +1,223 @@
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Streamed events, in the order the prompt asks the model to write the fields
+SCORE, STRENGTH, IMPROVEMENT, FEEDBACK = 'score', 'strength', 'improvement', 'feedback'
+
+_ITEM_EVENTS = {'strengths': STRENGTH, 'improvements': IMPROVEMENT}
+
+
+def _score(value: Any) -> int:
+    return min(100, max(0, int(float(value))))
+
+
+def normalize_assessment(assessment: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in missing fields and coerce types of a model-produced assessment"""
+    assessment['score'] = _score(assessment.get('score', 70))
+    assessment['strengths'] = list(assessment.get('strengths', ["Basic understanding shown"]))
+    assessment['improvements'] = list(assessment.get('improvements', ["Add more detail"]))
+    assessment['feedback'] = str(assessment.get('feedback', "Answer shows basic understanding but needs more depth."))
+    return assessment
+
+
+def parse_assessment(text: str) -> Dict[str, Any]:
+    """Assessment from the model's full response text.
+
+    The model sometimes wraps the JSON in prose or code fences, so the
+    outermost braces are taken. Raises ValueError (or json.JSONDecodeError).
+    """
+    text = text.strip()
+    start_idx = text.find('{')
+    end_idx = text.rfind('}')
+
+    if start_idx == -1 or end_idx == -1:
+        raise ValueError("Invalid JSON response from model")
+
+    return normalize_assessment(json.loads(text[start_idx:end_idx + 1]))
+
+
+def parse_assessment_batch(text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """Assessments for a packed batch prompt, by position; None for any the model left out.
+
+    Entries are matched by their "index" field when present, else by order.
+    Raises ValueError (or json.JSONDecodeError) if no array can be parsed.
+    """
+    text = text.strip()
+    start_idx = text.find('[')
+    end_idx = text.rfind(']')
+
+    if start_idx == -1 or end_idx == -1:
+        raise ValueError("Invalid JSON response from model")
+
+    entries = json.loads(text[start_idx:end_idx + 1])
+    if not isinstance(entries, list):
+        raise ValueError("Invalid JSON response from model")
+
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.pop('index', position)
+        try:
+            index = int(index)
+            if 0 <= index < count and results[index] is None:
+                results[index] = normalize_assessment(entry)
+        except (ValueError, TypeError):
+            logger.debug(f"Skipping batch entry with bad index or score: {entry}")
+    return results
+
+
+def assessment_events(assessment: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """The events a stream would have produced for a complete assessment"""
+    yield SCORE, assessment['score']
+    for item in assessment['strengths']:
+        yield STRENGTH, item
+    for item in assessment['improvements']:
+        yield IMPROVEMENT, item
+    yield FEEDBACK, assessment['feedback']
+
+
+def _decode_partial(raw: str) -> str:
+    """Decode the body of a JSON string that may end mid-escape"""
+    # The longest escape is \uXXXX, so at most 5 trailing characters are unusable
+    for cut in range(min(6, len(raw) + 1)):
+        try:
+            return json.loads('"' + raw[:len(raw) - cut] + '"')
+        except ValueError:
+            continue
+    return ''
+
+
+class AssessmentStreamParser:
+    """Incremental parser for the assessment object as the model streams it.
+
+    feed() takes text chunks and returns the events they complete: the score
+    once its number ends, each strength and improvement as soon as its string
+    closes, and the feedback text as deltas while it is being written. Text
+    before the opening brace (code fences, prose) and unknown keys are
+    skipped. The streamed events are for display only; result() parses the
+    full text with parse_assessment, so the stored assessment is exactly
+    what the non-streaming path would have produced.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._state = 'start'
+        self._key_raw: List[str] = []
+        self._key = None
+        self._raw: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = 0
+        self._feedback_sent = ''
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._chunks.append(chunk)
+        events: List[Tuple[str, Any]] = []
+        for c in chunk:
+            if self._state == 'value':
+                self._value_char(c, events)
+            elif self._state == 'start':
+                if c == '{':
+                    self._state = 'key'
+            elif self._state == 'key':
+                if c == '"':
+                    self._key_raw = [c]
+                    self._state = 'key_string'
+                elif c == '}':
+                    self._state = 'done'
+            elif self._state == 'key_string':
+                self._key_raw.append(c)
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._key = json.loads(''.join(self._key_raw))
+                    self._state = 'colon'
+            elif self._state == 'colon':
+                if c == ':':
+                    self._state = 'value_start'
+            elif self._state == 'value_start' and not c.isspace():
+                self._raw = []
+                self._depth = 0
+                self._state = 'value'
+                self._value_char(c, events)
+
+        if self._in_feedback():
+            self._feedback_delta(''.join(self._raw[1:]), events)
+        return events
+
+    def result(self) -> Dict[str, Any]:
+        """The complete assessment; call once the stream has ended"""
+        return parse_assessment(self.text)
+
+    def _in_feedback(self) -> bool:
+        return self._state == 'value' and self._key == 'feedback' and self._in_string and self._depth == 0
+
+    def _feedback_delta(self, raw: str, events: List[Tuple[str, Any]]):
+        decoded = _decode_partial(raw)
+        if len(decoded) > len(self._feedback_sent):
+            events.append((FEEDBACK, decoded[len(self._feedback_sent):]))
+            self._feedback_sent = decoded
+
+    def _value_char(self, c: str, events: List[Tuple[str, Any]]):
+        if self._in_string:
+            self._raw.append(c)
+            if self._escape:
+                self._escape = False
+            elif c == '\\':
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._finish_value(events)
+                elif self._depth == 1 and self._key in _ITEM_EVENTS:
+                    try:
+                        events.append((_ITEM_EVENTS[self._key], json.loads(''.join(self._raw[self._item_start:]))))
+                    except ValueError:
+                        pass
+            return
+
+        if c == '"':
+            self._in_string = True
+            self._item_start = len(self._raw)
+            self._raw.append(c)
+        elif c in '[{':
+            self._depth += 1
+            self._raw.append(c)
+        elif c in ']}':
+            if self._depth == 0:
+                # The closing brace of the assessment object itself
+                self._finish_value(events)
+                self._state = 'done'
+                return
+            self._depth -= 1
+            self._raw.append(c)
+            if self._depth == 0:
+                self._finish_value(events)
+        elif c == ',' and self._depth == 0:
+            self._finish_value(events)
+        else:
+            self._raw.append(c)
+
+    def _finish_value(self, events: List[Tuple[str, Any]]):
+        if self._state == 'value':
+            self._state = 'key'
+        raw = ''.join(self._raw).strip()
+        if self._key == 'feedback' and raw.startswith('"'):
+            self._feedback_delta(raw[1:-1], events)
+        elif self._key == 'score' and raw:
+            try:
+                events.append((SCORE, _score(json.loads(raw))))
+            except (ValueError, TypeError):
+                logger.debug(f"Unparseable streamed score: {raw}")
@@ -0,0 +1,88 @@
+"""Shared helpers for the benchmark scripts"""
+import os
+import sys
+import json
+import time
+import hashlib
+import platform
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+STUB_DIMENSION = 384
+
+
+class HashingEmbeddings:
+    """Deterministic bag-of-words embedder for offline benchmark runs.
+
+    Hashes unigrams and bigrams into a fixed-size vector, so runs need neither
+    a model download nor torch, and results are reproducible across machines.
+    Only the embedding quality differs from the real model; the index, pool
+    and batching code paths are the same.
+    """
+
+    def __init__(self, dimension: int = STUB_DIMENSION):
+        self.dimension = dimension
+        self.model_name = f"hashing-stub-{dimension}"
+        self.backend = 'hashing'
+        self.fingerprint = f"{self.model_name}@{self.backend}"
+
+    def _bucket(self, token: str) -> int:
+        return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big') % self.dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype='float32')
+        words = text.lower().split()
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            vector[self._bucket(token)] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds for samples given in seconds"""
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0, 'max': 0.0}
+    values = np.asarray(samples, dtype='float64') * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'mean': round(float(values.mean()), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Machine details recorded with every result file so runs can be compared"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def write_results(results: Dict[str, Any], path: str):
+    """Write results as JSON, or to stdout when path is '-'"""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if path == '-':
+        print(text)
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    print(f"Results written to {path}")
@@ -0,0 +1,173 @@
+"""Recall-vs-latency report for the vector index types the question index can use.
+
+Builds each index type over the same corpus, sweeps its search-time knob
+(nprobe for IVF, efSearch for HNSW) and reports build time, size, query
+latency and recall@k against exact search. Use it to pick VECTOR_INDEX_TYPE,
+VECTOR_NPROBE and VECTOR_EF_SEARCH for a deployment.
+
+    python benchmarks/bench_ann.py --size 100000 --output results/ann.json
+    python benchmarks/bench_ann.py --source index --size 200000 --budget-mb 256
+
+--source synthetic (default) draws clustered random vectors; --source index
+starts from the vectors in the persisted question index and perturbs them
+up to --size, which keeps the real embedding distribution.
+"""
+import time
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import faiss
+
+from _common import percentiles, environment, write_results
+
+from ann_index import build_index, choose_index_spec, estimated_bytes, ivf_nlist, pq_subquantizers, search_params
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_vectors(size: int, dimension: int, rng: np.random.Generator, clusters: int = 200) -> np.ndarray:
+    """Unit vectors drawn around random cluster centres, roughly like topic-grouped questions"""
+    centres = rng.standard_normal((clusters, dimension)).astype('float32')
+    assignments = rng.integers(0, clusters, size)
+    vectors = centres[assignments] + 0.6 * rng.standard_normal((size, dimension)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def index_vectors(size: int, rng: np.random.Generator, noise: float = 0.05) -> np.ndarray:
+    """Vectors from the persisted question index, perturbed copies added up to size"""
+    from vector_index import get_question_index
+    store = get_question_index()
+    if store is None:
+        raise RuntimeError("No question index available; build one with `python vector_index.py build`")
+    base = store.index.index.reconstruct_n(0, store.index.ntotal)
+    rows = rng.integers(0, len(base), size)
+    vectors = base[rows] + noise * rng.standard_normal((size, base.shape[1])).astype('float32')
+    vectors[:len(base)] = base[:size]
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int, **knobs) -> Dict[str, Any]:
+    latencies = []
+    found = np.empty((len(queries), k), dtype='int64')
+    for row, query in enumerate(queries):
+        params = search_params(index, k, **knobs)
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k, params=params)
+        latencies.append(time.perf_counter() - started)
+        found[row] = ids[0]
+
+    started = time.perf_counter()
+    index.search(queries, k, params=search_params(index, k, **knobs))
+    batch_seconds = time.perf_counter() - started
+
+    recall = np.mean([len(np.intersect1d(found[row], truth[row])) / k for row in range(len(queries))])
+    return {
+        'latency_ms': percentiles(latencies),
+        'batch_qps': round(len(queries) / batch_seconds, 1) if batch_seconds else 0.0,
+        'recall_at_k': round(float(recall), 4)
+    }
+
+
+def default_specs(size: int, dimension: int) -> List[str]:
+    nlist = ivf_nlist(size)
+    return [
+        'Flat',
+        'HNSW32',
+        'HNSW32,SQ8',
+        f"IVF{nlist},Flat",
+        f"IVF{nlist},SQ8",
+        f"IVF{nlist},PQ{pq_subquantizers(dimension)}",
+    ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recall vs latency for vector index types")
+    parser.add_argument('--source', choices=['synthetic', 'index'], default='synthetic', help="Corpus vectors")
+    parser.add_argument('--size', type=int, default=100000, help="Corpus size")
+    parser.add_argument('--dimension', type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument('--queries', type=int, default=500, help="Queries to time")
+    parser.add_argument('--k', type=int, default=10, help="Neighbours per query")
+    parser.add_argument('--specs', nargs='+', help="FAISS factory strings to compare (default: a standard set)")
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 16, 64], help="IVF nprobe values")
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[16, 32, 64, 128], help="HNSW efSearch values")
+    parser.add_argument('--budget-mb', type=float, help="Memory budget to report the automatic choice for")
+    parser.add_argument('--seed', type=int, default=13, help="Random seed")
+    parser.add_argument('--output', default='-', help="Result JSON path, '-' for stdout")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    if args.source == 'index':
+        vectors = index_vectors(args.size, rng)
+    else:
+        vectors = synthetic_vectors(args.size, args.dimension, rng)
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    size, dimension = vectors.shape
+
+    # Queries are perturbed corpus points, like a transcript close to a question
+    queries = vectors[rng.integers(0, size, args.queries)] + 0.1 * rng.standard_normal((args.queries, dimension)).astype('float32')
+    queries = np.ascontiguousarray(queries / np.linalg.norm(queries, axis=1, keepdims=True), dtype='float32')
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    ids = np.arange(size, dtype='int64')
+
+    budget = args.budget_mb * 2 ** 20 if args.budget_mb else None
+    automatic = choose_index_spec(size, dimension, budget, 'auto')
+
+    runs = []
+    for spec in args.specs or default_specs(size, dimension):
+        started = time.perf_counter()
+        index, built = build_index(spec, vectors, ids)
+        build_seconds = time.perf_counter() - started
+        size_bytes = faiss.serialize_index(index).nbytes
+
+        inner = faiss.downcast_index(index.index)
+        if isinstance(inner, faiss.IndexIVF):
+            sweep = [('nprobe', value, {'nprobe': value}) for value in args.nprobe]
+        elif isinstance(inner, faiss.IndexHNSW):
+            sweep = [('efSearch', value, {'ef_search': value}) for value in args.ef_search]
+        else:
+            sweep = [(None, None, {})]
+
+        for knob, value, knobs in sweep:
+            result = dict(
+                measure(index, queries, truth, args.k, **knobs),
+                index_type=built,
+                knob=knob,
+                value=value,
+                build_seconds=round(build_seconds, 2),
+                size_mb=round(size_bytes / 2 ** 20, 1),
+                estimated_mb=round(estimated_bytes(built, size, dimension) / 2 ** 20, 1),
+                automatic_choice=built == automatic
+            )
+            runs.append(result)
+            setting = f"{knob}={value}" if knob else ''
+            print(f"{built:<18} {setting:<14} recall@{args.k}={result['recall_at_k']:.3f} "
+                  f"p50={result['latency_ms']['p50']:.3f}ms p95={result['latency_ms']['p95']:.3f}ms "
+                  f"{result['size_mb']:.0f}MB build={build_seconds:.1f}s")
+
+    write_results({
+        'benchmark': 'ann',
+        'environment': environment(),
+        'config': {
+            'source': args.source,
+            'size': size,
+            'dimension': dimension,
+            'queries': args.queries,
+            'k': args.k,
+            'budget_mb': args.budget_mb,
+            'automatic_choice': automatic,
+            'faiss_threads': faiss.omp_get_max_threads()
+        },
+        'runs': runs
+    }, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+"""Compare embedding backends: startup time, memory and per-query latency.
+
+Each backend is measured in a fresh subprocess so import time and RSS are not
+shared between them. Vectors for the same texts are compared against the
+first backend listed, to show how far quantization moves them.
+
+    python benchmarks/bench_embedding_backends.py --output results/embedding_backends.json
+    python benchmarks/bench_embedding_backends.py --backends torch onnx-int8 --queries 500
+
+Run once with network access (or pre-populate the Hugging Face cache) so the
+model and ONNX exports are available; HF_HUB_OFFLINE=1 then keeps runs offline.
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import subprocess
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from _common import REPO_DIR, percentiles, environment, write_results
+
+logger = logging.getLogger(__name__)
+
+
+def sample_texts(count: int, seed: int) -> List[str]:
+    from question_catalog import catalog
+    texts = [question.text for question in catalog.all_questions()]
+    random.Random(seed).shuffle(texts)
+    return texts[:count]
+
+
+def measure(backend: str, model_name: str, queries: int, batch_size: int, seed: int) -> Dict[str, Any]:
+    """Runs inside the worker subprocess"""
+    import psutil
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    started = time.perf_counter()
+    from embedding_backends import load_embeddings, embedding_fingerprint
+    embeddings = load_embeddings(model_name, backend)
+    load_seconds = time.perf_counter() - started
+
+    texts = sample_texts(max(queries, batch_size), seed)
+
+    started = time.perf_counter()
+    embeddings.embed_query(texts[0])
+    first_query = time.perf_counter() - started
+
+    latencies = []
+    for text in texts[:queries]:
+        started = time.perf_counter()
+        embeddings.embed_query(text)
+        latencies.append(time.perf_counter() - started)
+
+    batch = texts[:batch_size]
+    started = time.perf_counter()
+    embeddings.embed_documents(batch)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'backend': backend,
+        'fingerprint': embedding_fingerprint(model_name, backend),
+        'startup_seconds': round(load_seconds, 3),
+        'first_query_ms': round(first_query * 1000.0, 3),
+        'query_latency_ms': percentiles(latencies),
+        'batch_size': len(batch),
+        'batch_texts_per_second': round(len(batch) / batch_seconds, 1) if batch_seconds else 0.0,
+        'rss_mb': round(process.memory_info().rss / 2 ** 20, 1),
+        'rss_delta_mb': round((process.memory_info().rss - rss_before) / 2 ** 20, 1),
+        'torch_imported': 'torch' in sys.modules,
+        # Reference vectors for the agreement check in the parent
+        'vectors': np.asarray(embeddings.embed_documents(batch), dtype='float32').tolist()
+    }
+
+
+def run_worker(backend: str, args) -> Optional[Dict[str, Any]]:
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', backend,
+        '--model', args.model, '--queries', str(args.queries),
+        '--batch-size', str(args.batch_size), '--seed', str(args.seed)
+    ]
+    completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        logger.error(f"Backend {backend} failed:\n{completed.stderr.strip()}")
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def agreement(reference: List[List[float]], vectors: List[List[float]]) -> Dict[str, float]:
+    """Cosine similarity between two backends' vectors for the same texts"""
+    a = np.asarray(reference, dtype='float32')
+    b = np.asarray(vectors, dtype='float32')
+    cosine = (a * b).sum(axis=1) / np.clip(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12, None)
+    return {'mean_cosine': round(float(cosine.mean()), 5), 'min_cosine': round(float(cosine.min()), 5)}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from embedding_backends import BACKENDS, EMBEDDING_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS,
+                        help="Backends to compare; the first is the reference for vector agreement")
+    parser.add_argument('--model', default=EMBEDDING_MODEL_NAME, help="Embedding model name")
+    parser.add_argument('--queries', type=int, default=200, help="Single-text queries to time")
+    parser.add_argument('--batch-size', type=int, default=32, help="Texts in the batch throughput test")
+    parser.add_argument('--seed', type=int, default=13, help="Seed for the sampled question texts")
+    parser.add_argument('--output', default='-', help="Result JSON path, '-' for stdout")
+    parser.add_argument('--worker', choices=BACKENDS, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.model, args.queries, args.batch_size, args.seed)))
+        return 0
+
+    results = []
+    reference = None
+    for backend in args.backends:
+        result = run_worker(backend, args)
+        if result is None:
+            results.append({'backend': backend, 'error': 'failed to run, see log'})
+            continue
+
+        vectors = result.pop('vectors')
+        if reference is None:
+            reference = (backend, vectors)
+        result['agreement'] = dict(agreement(reference[1], vectors), reference=reference[0])
+        results.append(result)
+        print(f"{backend:<10} startup={result['startup_seconds']:.2f}s rss={result['rss_mb']:.0f}MB "
+              f"p50={result['query_latency_ms']['p50']:.2f}ms p95={result['query_latency_ms']['p95']:.2f}ms "
+              f"batch={result['batch_texts_per_second']:.0f}/s cosine={result['agreement']['mean_cosine']:.4f}")
+
+    write_results({
+        'benchmark': 'embedding_backends',
+        'environment': environment(),
+        'config': {'model_name': args.model, 'queries': args.queries, 'batch_size': args.batch_size},
+        'runs': results
+    }, args.output)
+    return 0 if all('error' not in result for result in results) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,234 @@
+"""Latency, throughput and recall@k benchmark for get_similar_questions.
+
+Generates synthetic interview contexts per role from questions.json (or reads
+a labeled set), then calls get_similar_questions at each k and concurrency
+level exactly as the Socket.IO handlers do: from gevent greenlets, through
+the search pool and query batcher.
+
+    python benchmarks/bench_retrieval.py --stub-embeddings --output results/retrieval.json
+    python benchmarks/bench_retrieval.py --k 1 3 10 --concurrency 1 8 32 --queries 500
+
+--stub-embeddings uses a deterministic hashing embedder so the benchmark runs
+offline without torch; without it the configured HuggingFace model is loaded
+(set HF_HUB_OFFLINE=1 to use a locally cached copy only).
+"""
+import gevent.monkey
+gevent.monkey.patch_all()
+
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence
+
+import gevent.pool
+
+from _common import HashingEmbeddings, percentiles, environment, write_results
+
+# get_similar_questions never calls Gemini, but gemini_config refuses to import without a key
+os.environ.setdefault('GOOGLE_API_KEY', 'offline-benchmark')
+
+from gemini_config import get_similar_questions
+from keyword_index import tokenize
+from question_catalog import catalog
+from retrieval import bm25_index, hybrid_retriever
+from query_batcher import query_batcher
+from embedding_cache import embedding_cache, result_cache
+from embedding_backends import BACKENDS, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+from vector_index import INDEX_DIR, get_question_index
+
+logger = logging.getLogger(__name__)
+
+OPENERS = [
+    "So in my last project",
+    "Right, so basically",
+    "Um, I think",
+    "Good question, in my experience",
+    "Let me think about that, we",
+    "At my previous company",
+]
+CLOSERS = [
+    "and that worked pretty well for us.",
+    "if that makes sense.",
+    "but I'd probably do it differently now.",
+    "which was the main challenge.",
+    "",
+]
+
+
+def synthetic_contexts(count: int, seed: int, keep: float = 0.7) -> List[Dict[str, Any]]:
+    """Transcript-like contexts paraphrasing a known question, labeled with that question.
+
+    Each context keeps a random subset of the question's content words in a
+    loosely shuffled order, preceded by a sentence about a different question
+    of the same role, so the source question is relevant but not a verbatim match.
+    """
+    rng = random.Random(seed)
+    snapshot = catalog.snapshot()
+    roles = sorted(role for role, questions in snapshot.roles.items() if questions)
+
+    contexts = []
+    for n in range(count):
+        role = roles[n % len(roles)]
+        questions = snapshot.roles[role]
+        question = rng.choice(questions)
+        distractor = rng.choice(questions)
+
+        words = tokenize(question.text) or question.text.lower().split()
+        kept = [word for word in words if rng.random() < keep] or [rng.choice(words)]
+        # Swap neighbours rather than fully shuffling, like spoken rephrasing
+        for i in range(len(kept) - 1):
+            if rng.random() < 0.3:
+                kept[i], kept[i + 1] = kept[i + 1], kept[i]
+
+        noise = tokenize(distractor.text)[:3]
+        context = ' '.join(filter(None, [
+            rng.choice(OPENERS), ' '.join(noise) + '.',
+            "We also looked at", ' '.join(kept), rng.choice(CLOSERS)
+        ]))
+        contexts.append({'context': context, 'role': role, 'relevant': [question.text]})
+    return contexts
+
+
+def load_labeled_set(path: str) -> List[Dict[str, Any]]:
+    """A JSON list of {"context": ..., "role": ... (optional), "relevant": [question text, ...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    return [
+        {'context': item['context'], 'role': item.get('role'), 'relevant': list(item['relevant'])}
+        for item in items if item.get('context') and item.get('relevant')
+    ]
+
+
+def run_level(vector_store, items: List[Dict[str, Any]], k: int, concurrency: int) -> Dict[str, Any]:
+    """Issue every item's query from `concurrency` greenlets; collect latency and recall"""
+    latencies = []
+    recalls = []
+    empty = 0
+    errors = 0
+
+    def query(item):
+        started = time.perf_counter()
+        questions = get_similar_questions(vector_store, item['context'], item['role'], k=k)
+        return item, questions, time.perf_counter() - started
+
+    retriever_before = hybrid_retriever.stats()
+    batches_before, queries_before = query_batcher.batches, query_batcher.queries
+
+    pool = gevent.pool.Pool(concurrency)
+    started = time.perf_counter()
+    for greenlet in [pool.spawn(query, item) for item in items]:
+        greenlet.join()
+        if not greenlet.successful():
+            errors += 1
+            continue
+        item, questions, elapsed = greenlet.value
+        latencies.append(elapsed)
+        if not questions:
+            empty += 1
+        relevant = set(item['relevant'])
+        recalls.append(len(relevant.intersection(questions)) / len(relevant))
+    wall = time.perf_counter() - started
+
+    retriever_after = hybrid_retriever.stats()
+    batches = query_batcher.batches - batches_before
+    batched_queries = query_batcher.queries - queries_before
+
+    return {
+        'k': k,
+        'concurrency': concurrency,
+        'queries': len(items),
+        'latency_ms': percentiles(latencies),
+        'throughput_qps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'recall_at_k': round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+        'empty_results': empty,
+        'errors': errors,
+        'retrieval': {name: retriever_after[name] - retriever_before.get(name, 0) for name in retriever_after},
+        'avg_batch_size': round(batched_queries / batches, 2) if batches else 0.0,
+        'embedding_cache_hit_rate': round(embedding_cache.stats()['hit_rate'], 4),
+        'result_cache_hit_rate': round(result_cache.stats()['hit_rate'], 4)
+    }
+
+
+def reset_caches():
+    for cache in (embedding_cache, result_cache):
+        cache.clear()
+        cache.hits = cache.misses = cache.evictions = 0
+
+
+def load_vector_store(args):
+    if args.no_vector:
+        return None, None
+    if args.stub_embeddings:
+        embeddings = HashingEmbeddings()
+        directory = args.index_dir or tempfile.mkdtemp(prefix='bench-index-')
+        return get_question_index(embeddings, directory=directory, model_name=embeddings.model_name), embeddings.model_name
+    vector_store = get_question_index(directory=args.index_dir or INDEX_DIR, model_name=args.model, backend=args.backend)
+    return vector_store, args.model
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark question retrieval latency and recall@k")
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 3, 5, 10], help="k values to test")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help="Concurrent callers")
+    parser.add_argument('--queries', type=int, default=200, help="Synthetic queries per run")
+    parser.add_argument('--warmup', type=int, default=20, help="Unmeasured queries before the first run")
+    parser.add_argument('--seed', type=int, default=13, help="Seed for synthetic contexts")
+    parser.add_argument('--labels', help="Labeled set JSON to use instead of synthetic contexts")
+    parser.add_argument('--model', default=EMBEDDING_MODEL_NAME, help="Embedding model name")
+    parser.add_argument('--backend', default=EMBEDDING_BACKEND, choices=BACKENDS, help="Embedding backend")
+    parser.add_argument('--index-dir', help="Vector index artifact directory")
+    parser.add_argument('--stub-embeddings', action='store_true', help="Use the deterministic offline embedder")
+    parser.add_argument('--no-vector', action='store_true', help="Benchmark BM25-only retrieval")
+    parser.add_argument('--warm-cache', action='store_true', help="Keep embedding/result caches between runs")
+    parser.add_argument('--output', default='-', help="Result JSON path, '-' for stdout")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    vector_store, model_name = load_vector_store(args)
+    if not args.no_vector and vector_store is None:
+        logger.error("Vector index could not be loaded")
+        return 1
+    bm25_index.refresh()
+
+    items = load_labeled_set(args.labels) if args.labels else synthetic_contexts(args.queries, args.seed)
+    for item in synthetic_contexts(args.warmup, args.seed + 1):
+        get_similar_questions(vector_store, item['context'], item['role'])
+
+    runs = []
+    for k in args.k:
+        for concurrency in args.concurrency:
+            if not args.warm_cache:
+                reset_caches()
+            result = run_level(vector_store, items, k, concurrency)
+            runs.append(result)
+            print(f"k={k:<3} concurrency={concurrency:<4} "
+                  f"p50={result['latency_ms']['p50']:.2f}ms p95={result['latency_ms']['p95']:.2f}ms "
+                  f"p99={result['latency_ms']['p99']:.2f}ms {result['throughput_qps']:.1f} q/s "
+                  f"recall@k={result['recall_at_k']:.3f}")
+
+    write_results({
+        'benchmark': 'retrieval',
+        'environment': environment(),
+        'config': {
+            'embeddings': 'stub' if args.stub_embeddings else args.backend,
+            'model_name': model_name,
+            'vector': vector_store is not None,
+            'warm_cache': args.warm_cache,
+            'labeled_set': args.labels or f"synthetic(seed={args.seed})",
+            'corpus_size': len(catalog.snapshot()),
+            'index': vector_store.meta if vector_store is not None else None,
+            'search_pool': query_batcher.pool.stats(),
+            'batcher': {'max_batch': query_batcher.max_batch, 'max_wait_ms': query_batcher.max_wait * 1000.0}
+        },
+        'runs': runs
+    }, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+import os
+import time
+import random
+import logging
+from typing import Any, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open the breaker
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))
+# How long the breaker stays open after its first trip; doubles with each
+# consecutive trip up to the maximum
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv('LLM_BREAKER_OPEN_SECONDS', 15))
+LLM_BREAKER_MAX_OPEN_SECONDS = float(os.getenv('LLM_BREAKER_MAX_OPEN_SECONDS', 300))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt"""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    While closed, calls go through and consecutive failures are counted;
+    failure_threshold of them open the breaker. While open, allow() refuses
+    at once, so callers fail (or degrade) immediately instead of waiting on
+    a provider that is down. Once the open time has passed the breaker is
+    half-open and admits a single trial call: success closes it, failure
+    reopens it for twice as long (capped, with jitter so processes don't
+    retry in lockstep). Every allowed call must end with record_success(),
+    record_failure() or, if it never reached the provider or was abandoned,
+    release(); otherwise a half-open breaker would wait on its trial forever.
+    Callers pass the generation they were allowed under: outcomes of calls
+    that started before the latest trip are ignored, so a slow straggler
+    can't close the breaker (skipping the half-open trial and the growing
+    open time) or free a trial it never held.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, open_seconds: float = LLM_BREAKER_OPEN_SECONDS,
+                 max_open_seconds: float = LLM_BREAKER_MAX_OPEN_SECONDS, name: str = 'llm'):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max(open_seconds, max_open_seconds)
+        self.name = name
+        self._state = CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._retry_at = 0.0
+        self._trial_in_flight = False
+        self._generation = 0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._retry_at:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open, only the first caller gets through"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    @property
+    def generation(self) -> int:
+        """Bumped on every trip; identifies which calls an outcome belongs to"""
+        return self._generation
+
+    def _stale(self, generation: Optional[int]) -> bool:
+        return generation is not None and generation != self._generation
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a trial call through (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def release(self, generation: Optional[int] = None):
+        """End an allowed call without an outcome, freeing the half-open trial for the next caller"""
+        if self._state == HALF_OPEN and not self._stale(generation):
+            self._trial_in_flight = False
+
+    def record_success(self, generation: Optional[int] = None):
+        # Only the half-open trial may close an open breaker
+        if self._state == OPEN or self._stale(generation):
+            return
+        if self._state != CLOSED:
+            logger.info(f"{self.name} circuit closed")
+        self._state = CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, generation: Optional[int] = None):
+        if self._state == OPEN or self._stale(generation):
+            return
+        if self._state == HALF_OPEN:
+            self._trip()
+            return
+        self._failures += 1
+        if self._state == CLOSED and self._failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self):
+        self._trips += 1
+        self._generation += 1
+        delay = min(self.max_open_seconds, self.open_seconds * (2 ** (self._trips - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        self._state = OPEN
+        self._retry_at = time.monotonic() + delay
+        self._trial_in_flight = False
+        self.opened += 1
+        logger.warning(f"{self.name} circuit open for {delay:.0f}s after {self._failures} consecutive failures")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'retry_in_s': round(self.retry_in(), 1),
+            'opened': self.opened,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,138 @@
+import os
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'sentence-transformers/all-MiniLM-L6-v2')
+
+# Which runtime computes embeddings:
+#   'torch'     - sentence-transformers on PyTorch (float32)
+#   'onnx'      - ONNX Runtime on CPU (float32), no torch import
+#   'onnx-int8' - ONNX Runtime with a dynamically int8-quantized export
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+
+# ONNX exports published in the model's Hugging Face repo; EMBEDDING_ONNX_FILE
+# overrides the file (e.g. onnx/model_qint8_arm64.onnx on ARM hosts)
+ONNX_FILES = {
+    'onnx': 'onnx/model.onnx',
+    'onnx-int8': 'onnx/model_qint8_avx2.onnx',
+}
+EMBEDDING_ONNX_FILE = os.getenv('EMBEDDING_ONNX_FILE')
+EMBEDDING_MAX_LENGTH = int(os.getenv('EMBEDDING_MAX_LENGTH', 256))
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 32))
+# 0 lets ONNX Runtime pick; the search pool already runs several embeds in parallel
+EMBEDDING_ONNX_THREADS = int(os.getenv('EMBEDDING_ONNX_THREADS', 0))
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def embedding_fingerprint(model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND,
+                          onnx_file: Optional[str] = None) -> str:
+    """Identifies the vector space a backend produces.
+
+    Indexes and cached vectors are keyed by this, so vectors from one backend
+    are never compared with another's. The torch fingerprint is the bare model
+    name, which keeps artifacts built before backends were configurable valid.
+    """
+    if backend == 'torch':
+        return model_name
+    if backend in ONNX_FILES:
+        return f"{model_name}@{backend}:{onnx_file or EMBEDDING_ONNX_FILE or ONNX_FILES[backend]}"
+    return f"{model_name}@{backend}"
+
+
+class TorchEmbeddings:
+    """sentence-transformers model via LangChain's HuggingFaceEmbeddings"""
+
+    backend = 'torch'
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        self.model_name = model_name
+        self.fingerprint = embedding_fingerprint(model_name, self.backend)
+        self._model = HuggingFaceEmbeddings(model_name=model_name)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        return self._model.embed_documents(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._model.embed_query(text)
+
+
+class OnnxEmbeddings:
+    """The same sentence-transformers model run with ONNX Runtime and a Rust tokenizer.
+
+    Reproduces the model's mean pooling and normalization in numpy, so vectors
+    match the torch backend's (up to quantization error for int8) without
+    importing torch.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, backend: str = 'onnx',
+                 onnx_file: Optional[str] = None, max_length: int = EMBEDDING_MAX_LENGTH,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, threads: int = EMBEDDING_ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from huggingface_hub import hf_hub_download
+
+        self.backend = backend
+        self.model_name = model_name
+        self.onnx_file = onnx_file or EMBEDDING_ONNX_FILE or ONNX_FILES[backend]
+        self.fingerprint = embedding_fingerprint(model_name, backend, self.onnx_file)
+        self.batch_size = max(1, batch_size)
+
+        # Uses the local Hugging Face cache; set HF_HUB_OFFLINE=1 to never hit the network
+        model_path = hf_hub_download(model_name, self.onnx_file)
+        tokenizer_path = hf_hub_download(model_name, 'tokenizer.json')
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype='int64')
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype='int64')
+
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization, as in the
+        # sentence-transformers pipeline for this model
+        mask = attention_mask[..., None].astype('float32')
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        batches = [
+            self._embed_batch(texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        return np.vstack(batches).astype('float32').tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings(model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND):
+    """Load the embedding model with the configured backend"""
+    if backend == 'torch':
+        return TorchEmbeddings(model_name)
+    if backend in ONNX_FILES:
+        return OnnxEmbeddings(model_name, backend)
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {', '.join(BACKENDS)}")
@@ -89,7 +89,7 @@ function setupEventHandlers(socket) {
   // Add listener for voice analysis
   socket.on("voice_analysis", (data) => {
     if (data.questions && data.questions.length > 0) {
-      showSuggestedQuestions(data.questions);
+      showSuggestedQuestions(data.questions, socket);
     }
   });
 
@@ -233,7 +233,7 @@ function addQuestion(question) {
 }
 
 // Function to show suggested questions
-function showSuggestedQuestions(questions) {
+function showSuggestedQuestions(questions, socket) {
   // Find or create the suggested questions container
   let suggestedQuestionsContainer = document.getElementById("suggested-questions-container");
   
@@ -270,9 +270,16 @@ function showSuggestedQuestions(questions) {
       questionItem.className = "p-2 bg-white dark:bg-gray-700 rounded border-l-4 border-blue-500 cursor-pointer hover:bg-blue-50 dark:hover:bg-gray-600 transition";
       questionItem.textContent = question;
       
-      // Add click event to use this question
+      // Add click event to use this question; only a question that is
+      // actually used counts as asked, so the others can be suggested again
       questionItem.addEventListener("click", () => {
         addQuestion(question);
+        if (socket && questionData.id) {
+          socket.emit("question_selected", {
+            roomId: document.body.dataset.roomId,
+            questionId: questionData.id
+          });
+        }
       });
       
       questionsList.appendChild(questionItem);
@@ -11,6 +11,59 @@ document.addEventListener("DOMContentLoaded", function () {
   const spinner = document.getElementById("submitSpinner");
   const submitAnswerText = document.getElementById("submitAnswerText");
 
+  // How an answer is assessed:
+  //   1. streamed as Server-Sent Events whenever the browser can read a fetch
+  //      body incrementally, so the score shows up within the first tokens;
+  //   2. if the stream can't be used or breaks, queued as a background job
+  //      and pushed back over Socket.IO when the socket is connected;
+  //   3. otherwise a plain request that waits for the whole assessment.
+  // While the AI service is down the server queues streamed answers itself
+  // and the page waits for the job's result (pushed, or polled).
+  const supportsStreaming = typeof ReadableStream !== "undefined" && typeof TextDecoder !== "undefined";
+  const socket = typeof io !== "undefined" ? io() : null;
+  const pendingAssessments = {};
+
+  if (socket) {
+    socket.on("assessment_result", (job) => {
+      const pending = pendingAssessments[job.job_id];
+      if (pending) {
+        pending(job);
+      }
+    });
+  }
+
+  // Resolves with the finished job from the push, or from polling if the
+  // push doesn't arrive (e.g. the socket reconnected in between)
+  function waitForAssessment(jobId) {
+    return new Promise((resolve) => {
+      let pollTimer = null;
+      const finish = (job) => {
+        delete pendingAssessments[jobId];
+        clearTimeout(pollTimer);
+        resolve(job);
+      };
+      const poll = async () => {
+        try {
+          const response = await fetch(`/assessment-jobs/${jobId}`);
+          const job = await response.json();
+          if (!response.ok) {
+            finish({ status: "failed", error: job.error });
+            return;
+          }
+          if (job.status === "done" || job.status === "failed") {
+            finish(job);
+            return;
+          }
+        } catch (error) {
+          console.error("Error polling assessment:", error);
+        }
+        pollTimer = setTimeout(poll, 3000);
+      };
+      pendingAssessments[jobId] = finish;
+      pollTimer = setTimeout(poll, 5000);
+    });
+  }
+
   function updateAIStatus(status, message) {
     const indicator = document.getElementById('aiStatusIndicator');
     const messageEl = document.getElementById('aiStatusMessage');
@@ -95,6 +148,20 @@ document.addEventListener("DOMContentLoaded", function () {
     spinner.classList.remove('hidden');
     
     try {
+      if (supportsStreaming) {
+        try {
+          await streamAssessment(role, question, answer);
+          return;
+        } catch (error) {
+          if (!error.retryable) {
+            throw error;
+          }
+          console.warn('Streaming assessment failed, retrying without streaming:', error);
+        }
+      }
+      
+      const useAsyncAssessment = socket !== null && socket.connected;
+      
       const response = await fetch('/submit-answer', {
         method: 'POST',
         headers: {
@@ -103,16 +170,26 @@ document.addEventListener("DOMContentLoaded", function () {
         body: JSON.stringify({
           role: role,
           question: question,
-          answer: answer
+          answer: answer,
+          async: useAsyncAssessment
         })
       });
       
-      const data = await response.json();
+      let data = await response.json();
       
       if (!response.ok) {
         throw new Error(data.error || data.details || 'Failed to submit answer');
       }
       
+      if (response.status === 202) {
+        submitAnswerText.textContent = data.degraded ? 'Queued...' : 'Assessing...';
+        const job = await waitForAssessment(data.job_id);
+        if (job.status !== 'done') {
+          throw new Error(job.error || 'Failed to get assessment from model');
+        }
+        data = Object.assign({}, job.assessment, { cached: job.cached });
+      }
+      
       // If we got here, the assessment was successful
       displayAssessment(data);
       
@@ -132,7 +209,114 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   }
 
+  // A failure of the stream itself (network, server or model error), after
+  // which the answer is worth submitting again without streaming
+  function streamFailure(message) {
+    const error = new Error(message);
+    error.retryable = true;
+    return error;
+  }
+
+  // Streams the assessment as Server-Sent Events and fills in the modal as
+  // the score, items and feedback arrive
+  async function streamAssessment(role, question, answer) {
+    let response;
+    try {
+      response = await fetch('/submit-answer/stream', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+          role: role,
+          question: question,
+          answer: answer
+        })
+      });
+    } catch (error) {
+      throw streamFailure(error.message);
+    }
+    
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      const message = data.error || data.details || 'Failed to submit answer';
+      // Invalid submissions would fail the same way without streaming
+      throw response.status >= 500 ? streamFailure(message) : new Error(message);
+    }
+    
+    const partial = { score: null, strengths: [], improvements: [], feedback: '' };
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+      let chunk;
+      try {
+        chunk = await reader.read();
+      } catch (error) {
+        throw streamFailure(error.message);
+      }
+      const { value, done } = chunk;
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const message = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        
+        let event = 'message';
+        let data = '';
+        message.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+          }
+        });
+        const payload = JSON.parse(data);
+        
+        if (event === 'score') {
+          partial.score = payload;
+        } else if (event === 'strength') {
+          partial.strengths.push(payload);
+        } else if (event === 'improvement') {
+          partial.improvements.push(payload);
+        } else if (event === 'feedback') {
+          partial.feedback += payload;
+        } else if (event === 'complete') {
+          displayAssessment(payload);
+          return;
+        } else if (event === 'queued') {
+          // The AI service is down; the answer is assessed once it recovers
+          submitAnswerText.textContent = 'Queued...';
+          const job = await waitForAssessment(payload.job_id);
+          if (job.status !== 'done') {
+            throw new Error(job.error || 'Failed to get assessment from model');
+          }
+          displayAssessment(Object.assign({}, job.assessment, { cached: job.cached }));
+          return;
+        } else if (event === 'error') {
+          throw streamFailure(payload.error || payload.details || 'Failed to get assessment from model');
+        }
+        renderAssessment(partial);
+      }
+    }
+    
+    throw streamFailure('Assessment stream ended unexpectedly');
+  }
+
   function displayAssessment(assessment) {
+    renderAssessment(assessment);
+    
+    // Update the chart if it exists
+    updateChart(assessment.score);
+  }
+
+  // Renders a complete or partially streamed assessment (score may still be null)
+  function renderAssessment(assessment) {
     const modal = document.getElementById('assessmentModal');
     const resultsDiv = document.getElementById('assessmentResults');
     
@@ -145,7 +329,7 @@ document.addEventListener("DOMContentLoaded", function () {
     scoreDiv.innerHTML = `
       <div class="flex items-center justify-between">
         <span class="text-lg font-semibold">Score:</span>
-        <span class="text-2xl font-bold ${assessment.score >= 70 ? 'text-green-500' : 'text-yellow-500'}">${assessment.score}/100</span>
+        <span class="text-2xl font-bold ${assessment.score >= 70 ? 'text-green-500' : 'text-yellow-500'}">${assessment.score === null ? '...' : assessment.score}/100</span>
       </div>
     `;
     resultsDiv.appendChild(scoreDiv);
@@ -189,9 +373,6 @@ document.addEventListener("DOMContentLoaded", function () {
     
     // Show the modal
     modal.classList.remove('hidden');
-    
-    // Update the chart if it exists
-    updateChart(assessment.score);
   }
 
   // Function to update the chart with new score
@@ -0,0 +1,468 @@
+"""Bulk import of external question corpora into the catalog and vector index.
+
+    python ingest.py dumps/questions.jsonl dumps/leetcode.csv --role "Software Engineer"
+
+Input files are streamed a record at a time, so their size doesn't matter.
+Each question is normalized, dropped if it duplicates a catalog question
+exactly or nearly (SimHash over word shingles), given its stable id, and
+appended to the corpus file (QUESTION_CORPUS_PATH) that the catalog merges
+with questions.json. New questions are embedded in batches and added to the
+persisted vector index chunk by chunk, so memory stays bounded by the chunk
+size rather than the input size.
+
+The index is saved, the corpus appended and progress checkpointed every
+INGEST_CHECKPOINT_SIZE questions; re-running the same command after an
+interruption resumes from the last checkpoint. Anything written but not
+yet checkpointed is caught by the duplicate check.
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import itertools
+import unicodedata
+import traceback
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from question_catalog import CORPUS_PATH, QUESTIONS_PATH, CatalogSnapshot, Question, QuestionCatalog, question_id
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 256))
+# Questions embedded and added to the index at a time
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 4096))
+# Questions per checkpoint; the index artifact and corpus are written once per checkpoint
+INGEST_CHECKPOINT_SIZE = int(os.getenv('INGEST_CHECKPOINT_SIZE', 65536))
+# Questions whose SimHashes differ in at most this many of 64 bits are near-duplicates
+NEAR_DUPLICATE_DISTANCE = int(os.getenv('INGEST_NEAR_DUPLICATE_DISTANCE', 3))
+
+MIN_QUESTION_LENGTH = 10
+MAX_QUESTION_LENGTH = 1000
+MAX_TOPICS = 10
+
+# Source field names tried in order for each attribute
+TEXT_FIELDS = ('question', 'text', 'title', 'prompt')
+ROLE_FIELDS = ('role', 'job_role', 'position', 'category')
+TOPIC_FIELDS = ('topics', 'tags', 'expected_topics', 'topic')
+DIFFICULTY_FIELDS = ('difficulty', 'level')
+
+DIFFICULTY_ALIASES = {
+    'easy': 'easy', 'beginner': 'easy', 'junior': 'easy', 'basic': 'easy', '1': 'easy', '2': 'easy',
+    'medium': 'medium', 'intermediate': 'medium', 'mid': 'medium', 'moderate': 'medium', '3': 'medium',
+    'hard': 'hard', 'advanced': 'hard', 'senior': 'hard', 'expert': 'hard', '4': 'hard', '5': 'hard',
+}
+
+_WORD_PATTERN = re.compile(r"\w+(?:[.+#']\w*)*")
+_TOPIC_SEPARATORS = re.compile(r"[,;|]")
+# Four 16-bit bands: two hashes within 3 bits of each other share at least one
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+
+
+def _first(record: Dict[str, Any], fields: Sequence[str]):
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalized text with control characters removed and whitespace collapsed"""
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join(ch if unicodedata.category(ch)[0] != 'C' else ' ' for ch in text)
+    return ' '.join(text.split())
+
+
+def canonical_text(text: str) -> str:
+    """Case- and punctuation-insensitive form used for exact duplicate checks"""
+    return ' '.join(_WORD_PATTERN.findall(text.lower()))
+
+
+def normalize_topics(value) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        value = _TOPIC_SEPARATORS.split(value)
+    if not isinstance(value, (list, tuple)):
+        return ()
+    topics = (normalize_text(str(topic)) for topic in value)
+    return tuple(dict.fromkeys(topic for topic in topics if topic))[:MAX_TOPICS]
+
+
+def normalize_difficulty(value) -> Optional[str]:
+    if value is None:
+        return None
+    return DIFFICULTY_ALIASES.get(normalize_text(str(value)).lower())
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over a question's words and word bigrams"""
+    words = _WORD_PATTERN.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    hashes = np.array([int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+                       for feature in features], dtype='>u8')
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(len(features), 64)
+    weights = bits.sum(axis=0, dtype=np.int32) * 2 - len(features)
+    return int.from_bytes(np.packbits(weights > 0).tobytes(), 'big')
+
+
+class Deduplicator:
+    """Exact and near-duplicate detection within each role.
+
+    Holds one canonical-text hash and four SimHash band entries per known
+    question, so it grows with the catalog, not with the size of the input.
+    """
+
+    def __init__(self, max_distance: int = NEAR_DUPLICATE_DISTANCE):
+        if max_distance >= _BANDS:
+            raise ValueError(f"Near-duplicate distance must be below {_BANDS}")
+        self.max_distance = max_distance
+        self._exact = set()
+        self._bands: Dict[int, List[int]] = {}
+
+    def _band_keys(self, role: str, fingerprint: int) -> List[int]:
+        mask = (1 << _BAND_BITS) - 1
+        return [hash((role, band, (fingerprint >> (band * _BAND_BITS)) & mask)) for band in range(_BANDS)]
+
+    @staticmethod
+    def _exact_key(role: str, text: str) -> int:
+        return question_id(role.lower(), canonical_text(text))
+
+    def admit(self, role: str, text: str) -> Optional[str]:
+        """'exact' or 'near' if text duplicates a known question of the role, else records it and returns None"""
+        exact_key = self._exact_key(role, text)
+        if exact_key in self._exact:
+            return 'exact'
+
+        keys = ()
+        if self.max_distance:
+            fingerprint = simhash(text)
+            keys = self._band_keys(role, fingerprint)
+            for key in keys:
+                for other in self._bands.get(key, ()):
+                    if bin(fingerprint ^ other).count('1') <= self.max_distance:
+                        return 'near'
+
+        self._exact.add(exact_key)
+        for key in keys:
+            self._bands.setdefault(key, []).append(fingerprint)
+        return None
+
+    def __len__(self):
+        return len(self._exact)
+
+
+def read_records(path: str, file_format: Optional[str] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """Stream records from a JSONL or CSV/TSV file; yields None for unparseable lines"""
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = {'.csv': 'csv', '.tsv': 'tsv'}.get(extension, 'jsonl')
+
+    if file_format == 'jsonl':
+        with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    yield None
+                    continue
+                yield record if isinstance(record, dict) else None
+    else:
+        with open(path, 'r', encoding='utf-8-sig', errors='replace', newline='') as f:
+            yield from csv.DictReader(f, delimiter='\t' if file_format == 'tsv' else ',')
+
+
+class CorpusIngester:
+    """Normalizes, deduplicates and writes questions in chunks.
+
+    Each chunk is embedded batch by batch and added in place to a private
+    copy of the vector index. At each checkpoint the index is saved as the
+    artifact for the catalog contents *after* the append, then the buffered
+    questions are appended to the corpus, then progress is checkpointed. A
+    running server therefore finds a ready index when it notices the corpus
+    change, instead of embedding the questions itself.
+    """
+
+    def __init__(self, catalog: QuestionCatalog, vector_index=None, index_dir: Optional[str] = None,
+                 default_role: Optional[str] = None, batch_size: int = INGEST_BATCH_SIZE,
+                 chunk_size: int = INGEST_CHUNK_SIZE, max_distance: int = NEAR_DUPLICATE_DISTANCE,
+                 resume: bool = True, checkpoint_size: int = INGEST_CHECKPOINT_SIZE):
+        if not catalog.corpus_path:
+            raise ValueError("The catalog has no corpus path to ingest into")
+        self.catalog = catalog
+        self.corpus_path = catalog.corpus_path
+        self.checkpoint_path = f"{self.corpus_path}.checkpoint.json"
+        self.vector_index = vector_index
+        if vector_index is not None:
+            vector_index.detach()
+        self.index_dir = index_dir
+        self.default_role = default_role
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.checkpoint_size = max(chunk_size, checkpoint_size)
+        self.deduplicator = Deduplicator(max_distance)
+        self.stats = {'read': 0, 'skipped': 0, 'invalid': 0, 'exact_duplicates': 0, 'near_duplicates': 0, 'added': 0}
+        self.timings = {'normalize': 0.0, 'dedupe': 0.0, 'embed': 0.0, 'write': 0.0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.corpus_path)), exist_ok=True)
+        self._repair_corpus()
+        snapshot = catalog.snapshot()
+        self._roles = {}
+        if snapshot is not None:
+            self._seed(snapshot)
+        self._digest = catalog.content_digest()
+        self._checkpoint = self._read_checkpoint() if resume else {'sources': {}}
+        # Corpus lines added to the index but not yet checkpointed
+        self._pending: List[bytes] = []
+        self._pending_count = 0
+
+    def _repair_corpus(self):
+        """Drop a partial last line left by an interrupted append"""
+        if not os.path.exists(self.corpus_path):
+            return
+        with open(self.corpus_path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            position = size
+            while position > 0:
+                step = min(1 << 16, position)
+                f.seek(position - step)
+                newline = f.read(step).rfind(b'\n')
+                if newline != -1:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            f.truncate(position)
+            logger.warning(f"Truncated a partial last line from {self.corpus_path}")
+
+    def _seed(self, snapshot: CatalogSnapshot):
+        for question in snapshot.by_id.values():
+            self.deduplicator.admit(question.role, question.text)
+            self._roles.setdefault(question.role.lower(), question.role)
+
+    def _read_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'sources': {}}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable ingest checkpoint: {e}")
+            return {'sources': {}}
+
+    def _write_checkpoint(self):
+        staging = f"{self.checkpoint_path}.tmp-{os.getpid()}"
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump(self._checkpoint, f)
+        os.replace(staging, self.checkpoint_path)
+
+    def normalize(self, record: Dict[str, Any]) -> Optional[Question]:
+        """Question for a source record, or None if it has no usable text or role"""
+        text = _first(record, TEXT_FIELDS)
+        role = _first(record, ROLE_FIELDS) or self.default_role
+        if not isinstance(text, str) or not role:
+            return None
+
+        text = normalize_text(text)
+        role = normalize_text(str(role))
+        if not MIN_QUESTION_LENGTH <= len(text) <= MAX_QUESTION_LENGTH or not role:
+            return None
+        # Match existing roles case-insensitively so 'data scientist' joins 'Data Scientist'
+        role = self._roles.setdefault(role.lower(), role)
+
+        topics = normalize_topics(_first(record, TOPIC_FIELDS))
+        difficulty = normalize_difficulty(_first(record, DIFFICULTY_FIELDS))
+        return Question(question_id(role, text), role, text, topics, difficulty)
+
+    def ingest(self, path: str, file_format: Optional[str] = None) -> Dict[str, int]:
+        """Ingest one file, resuming from its checkpoint if its contents haven't changed"""
+        stat = os.stat(path)
+        source = os.path.abspath(path)
+        state = self._checkpoint['sources'].get(source)
+        if not state or state.get('size') != stat.st_size or state.get('mtime_ns') != stat.st_mtime_ns:
+            state = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'records': 0, 'done': False}
+        if state['done']:
+            logger.info(f"{path} was already ingested, skipping")
+            return self.stats
+        if state['records']:
+            logger.info(f"Resuming {path} after {state['records']} records")
+        self._checkpoint['sources'][source] = state
+
+        records = read_records(path, file_format)
+        position = state['records']
+        skipped = sum(1 for _ in itertools.islice(records, position))
+        self.stats['skipped'] += skipped
+
+        chunk: List[Question] = []
+        for record in records:
+            position += 1
+            self.stats['read'] += 1
+
+            started = time.perf_counter()
+            question = self.normalize(record) if record else None
+            self.timings['normalize'] += time.perf_counter() - started
+            if question is None:
+                self.stats['invalid'] += 1
+                continue
+
+            started = time.perf_counter()
+            duplicate = self.deduplicator.admit(question.role, question.text)
+            self.timings['dedupe'] += time.perf_counter() - started
+            if duplicate:
+                self.stats[f"{duplicate}_duplicates"] += 1
+                continue
+
+            chunk.append(question)
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk, source, position, os.path.basename(path))
+                chunk = []
+
+        self._write_chunk(chunk, source, position, os.path.basename(path), final=True)
+        state['done'] = True
+        self._write_checkpoint()
+        return self.stats
+
+    def _embed(self, questions: List[Question]) -> np.ndarray:
+        embeddings = self.vector_index.embeddings
+        batches = []
+        for start in range(0, len(questions), self.batch_size):
+            texts = [q.text for q in questions[start:start + self.batch_size]]
+            batches.append(np.asarray(embeddings.embed_documents(texts), dtype='float32'))
+        return np.ascontiguousarray(np.vstack(batches))
+
+    def _write_chunk(self, questions: List[Question], source: str, position: int, source_name: str,
+                     final: bool = False):
+        if questions:
+            lines = ''.join(json.dumps({
+                'id': q.id,
+                'role': q.role,
+                'text': q.text,
+                'topics': list(q.topics),
+                'difficulty': q.difficulty,
+                'source': source_name
+            }, ensure_ascii=False) + '\n' for q in questions).encode('utf-8')
+            self._digest.update(lines)
+
+            if self.vector_index is not None:
+                started = time.perf_counter()
+                vectors = self._embed(questions)
+                self.timings['embed'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                self.vector_index.add_questions(questions, self._digest.hexdigest(), vectors, in_place=True)
+                self.timings['write'] += time.perf_counter() - started
+
+            self._pending.append(lines)
+            self._pending_count += len(questions)
+
+        if final or self._pending_count >= self.checkpoint_size:
+            self._write_checkpoint_data(source, position)
+
+    def _write_checkpoint_data(self, source: str, position: int):
+        """Save the index, append the buffered questions to the corpus and record progress"""
+        if self._pending:
+            started = time.perf_counter()
+            if self.vector_index is not None:
+                self.vector_index.save(self.index_dir)
+            with open(self.corpus_path, 'ab') as f:
+                f.write(b''.join(self._pending))
+                f.flush()
+                os.fsync(f.fileno())
+            self.timings['write'] += time.perf_counter() - started
+            self.stats['added'] += self._pending_count
+            self._pending = []
+            self._pending_count = 0
+
+        self._checkpoint['sources'][source]['records'] = position
+        self._write_checkpoint()
+
+
+def _format_report(stats: Dict[str, int], timings: Dict[str, float], elapsed: float) -> str:
+    rate = stats['read'] / elapsed if elapsed else 0.0
+    stages = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items())
+    return (f"{stats['read']} read, {stats['added']} added, {stats['exact_duplicates']} duplicates, "
+            f"{stats['near_duplicates']} near-duplicates, {stats['invalid']} invalid in {elapsed:.1f}s "
+            f"({rate:.0f} questions/s; {stages})")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from embedding_backends import BACKENDS, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, load_embeddings
+    from vector_index import INDEX_DIR, _reindex_if_needed, get_question_index
+
+    parser = argparse.ArgumentParser(description="Ingest JSONL/CSV question dumps into the catalog and vector index")
+    parser.add_argument('inputs', nargs='+', help="JSONL, CSV or TSV files")
+    parser.add_argument('--format', choices=['jsonl', 'csv', 'tsv'], help="Input format (default: by extension)")
+    parser.add_argument('--role', help="Role for records that don't name one")
+    parser.add_argument('--questions', default=QUESTIONS_PATH, help="Path to questions.json")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help="Corpus file to append to")
+    parser.add_argument('--index-dir', default=INDEX_DIR, help="Vector index artifact directory")
+    parser.add_argument('--no-index', action='store_true', help="Only write the corpus; the server embeds it on reload")
+    parser.add_argument('--model', default=EMBEDDING_MODEL_NAME, help="Embedding model name")
+    parser.add_argument('--backend', default=EMBEDDING_BACKEND, choices=BACKENDS, help="Embedding backend")
+    parser.add_argument('--batch-size', type=int, default=INGEST_BATCH_SIZE, help="Texts per embedding call")
+    parser.add_argument('--chunk-size', type=int, default=INGEST_CHUNK_SIZE,
+                        help="Questions embedded and added to the index at a time")
+    parser.add_argument('--checkpoint-size', type=int, default=INGEST_CHECKPOINT_SIZE,
+                        help="Questions per checkpoint (index save and corpus append)")
+    parser.add_argument('--near-distance', type=int, default=NEAR_DUPLICATE_DISTANCE,
+                        help="Max SimHash bit distance for near-duplicates (0 disables)")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and re-read every input")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        started = time.perf_counter()
+        catalog = QuestionCatalog(args.questions, corpus_path=args.corpus)
+
+        vector_index = None
+        if not args.no_index:
+            vector_index = get_question_index(catalog=catalog, directory=args.index_dir,
+                                              model_name=args.model, backend=args.backend)
+            if vector_index is None:
+                return 1
+            if vector_index.embeddings is None:
+                vector_index.embeddings = load_embeddings(args.model, args.backend)
+
+        ingester = CorpusIngester(catalog, vector_index, args.index_dir, args.role, args.batch_size,
+                                  args.chunk_size, args.near_distance, resume=not args.restart,
+                                  checkpoint_size=args.checkpoint_size)
+        ingest_started = time.perf_counter()
+
+        for path in args.inputs:
+            ingester.ingest(path, args.format)
+            logger.info(f"{path}: {_format_report(ingester.stats, ingester.timings, time.perf_counter() - ingest_started)}")
+
+        if vector_index is not None:
+            # The index may have outgrown its type, e.g. exact search past VECTOR_FLAT_MAX
+            reindexed = _reindex_if_needed(vector_index)
+            if reindexed is not vector_index:
+                reindexed.save(args.index_dir)
+
+        print(_format_report(ingester.stats, ingester.timings, time.perf_counter() - ingest_started))
+        print(f"Catalog now has {len(ingester.deduplicator)} questions ({time.perf_counter() - started:.1f}s total)")
+        return 0
+    except Exception as e:
+        logger.error(f"Error ingesting questions: {e}")
+        logger.error(traceback.format_exc())
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
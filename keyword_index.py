@@ -0,0 +1,38 @@
+import re
+import logging
+from functools import lru_cache
+from typing import FrozenSet, List
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Word tokenizer: keeps technology names such as c++, c# and node.js together
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.+#][a-z0-9+#]*)*")
+
+# Used when the NLTK stopword corpus has not been downloaded
+FALLBACK_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves
+""".split())
+
+
+@lru_cache(maxsize=1)
+def get_stopwords() -> FrozenSet[str]:
+    """English stopword set, loaded once per process"""
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except Exception as e:
+        logger.warning(f"NLTK stopwords unavailable, using built-in list: {e}")
+        return FALLBACK_STOPWORDS
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens with stopwords removed, in order of appearance"""
+    stop_words = get_stopwords()
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in stop_words]
@@ -0,0 +1,189 @@
+import os
+import time
+import heapq
+import itertools
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import gevent
+from gevent.event import Event
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first: question suggestions during a live
+# interview, then practice assessments, then health probes
+LIVE, PRACTICE, HEALTH = 0, 1, 2
+PRIORITY_NAMES = {LIVE: 'live', PRACTICE: 'practice', HEALTH: 'health'}
+
+# Token bucket matched to the API quota: sustained requests per minute and burst size
+LLM_RATE_PER_MINUTE = float(os.getenv('LLM_RATE_PER_MINUTE', 60))
+LLM_BURST = float(os.getenv('LLM_BURST', 10))
+# Gemini calls running at once, across all classes
+LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', 8))
+# How long a call may wait for admission before giving up, per class
+LLM_QUEUE_TIMEOUTS = {
+    LIVE: float(os.getenv('LLM_QUEUE_TIMEOUT_LIVE', 10)),
+    PRACTICE: float(os.getenv('LLM_QUEUE_TIMEOUT_PRACTICE', 30)),
+    HEALTH: float(os.getenv('LLM_QUEUE_TIMEOUT_HEALTH', 5))
+}
+
+
+class AdmissionTimeout(Exception):
+    """A call waited longer than its class's queue timeout for admission"""
+
+
+class _Waiter:
+    __slots__ = ('event', 'cancelled')
+
+    def __init__(self):
+        self.event = Event()
+        self.cancelled = False
+
+
+class _ClassStats:
+    __slots__ = ('admitted', 'timeouts', 'queued', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.admitted = 0
+        self.timeouts = 0
+        self.queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'admitted': self.admitted,
+            'timeouts': self.timeouts,
+            'queued': self.queued,
+            'mean_queue_ms': round(self.wait_total / self.admitted * 1000.0, 1) if self.admitted else 0.0,
+            'max_queue_ms': round(self.wait_max * 1000.0, 1)
+        }
+
+
+class AdmissionController:
+    """Decides when each Gemini call may start.
+
+    A call needs a token from a bucket refilled at the quota rate and one of
+    max_in_flight slots. Calls that can't start at once wait in a priority
+    queue, so a burst of practice assessments queues behind live interview
+    calls instead of spending the quota they need; within a class, calls
+    start in arrival order. A rate or max_in_flight of 0 disables that limit.
+    All state is only touched from greenlets on the hub, so no locking is
+    needed.
+    """
+
+    def __init__(self, rate_per_minute: float = LLM_RATE_PER_MINUTE, burst: float = LLM_BURST,
+                 max_in_flight: int = LLM_MAX_IN_FLIGHT, queue_timeouts: Optional[Dict[int, float]] = None):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1.0, burst)
+        self.max_in_flight = max_in_flight
+        self.queue_timeouts = dict(queue_timeouts or LLM_QUEUE_TIMEOUTS)
+        self.in_flight = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._waiters: List[Any] = []
+        self._order = itertools.count()
+        self._timer = None
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_NAMES}
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _can_start(self) -> bool:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return False
+        self._refill()
+        return self.rate <= 0 or self._tokens >= 1.0
+
+    def _start(self):
+        self.in_flight += 1
+        if self.rate > 0:
+            self._tokens -= 1.0
+
+    def _dispatch(self):
+        """Admit queued calls, best priority first, while capacity allows"""
+        while self._waiters:
+            if self._waiters[0][2].cancelled:
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_start():
+                if self.rate > 0 and self._tokens < 1.0 and self._timer is None:
+                    # Out of tokens rather than slots: look again when the next one is due
+                    self._timer = gevent.spawn_later((1.0 - self._tokens) / self.rate, self._on_timer)
+                return
+            _, _, waiter = heapq.heappop(self._waiters)
+            self._start()
+            waiter.event.set()
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def acquire(self, priority: int = PRACTICE, timeout: Optional[float] = None):
+        """Wait until a call of this priority may start; raises AdmissionTimeout"""
+        stats = self._stats[priority]
+        if not self._waiters and self._can_start():
+            self._start()
+            stats.admitted += 1
+            return
+
+        waiter = _Waiter()
+        heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+        stats.queued += 1
+        started = time.perf_counter()
+        admitted = False
+        try:
+            self._dispatch()
+            timeout = self.queue_timeouts.get(priority) if timeout is None else timeout
+            if not waiter.event.wait(timeout):
+                stats.timeouts += 1
+                raise AdmissionTimeout(f"Gemini is busy: no capacity for a {PRIORITY_NAMES[priority]} call "
+                                       f"within {timeout:.0f}s")
+            admitted = True
+        finally:
+            stats.queued -= 1
+            # Timed out, or killed while waiting (e.g. the client went away)
+            if not admitted:
+                if waiter.event.is_set():
+                    # Admitted by _dispatch but never handed over: give the slot back
+                    self.release()
+                else:
+                    waiter.cancelled = True
+
+        waited = time.perf_counter() - started
+        stats.admitted += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: int = PRACTICE, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold admission for one call for the duration of the block"""
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            'rate_per_minute': self.rate * 60.0,
+            'burst': self.burst,
+            'tokens': round(self._tokens, 2),
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'classes': {PRIORITY_NAMES[priority]: stats.stats() for priority, stats in self._stats.items()}
+        }
+
+
+# Shared admission controller for every Gemini call in the process
+llm_admission = AdmissionController()
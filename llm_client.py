@@ -0,0 +1,377 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import gevent
+import requests
+from gevent.event import AsyncResult
+from requests.adapters import HTTPAdapter
+
+from llm_admission import AdmissionController, AdmissionTimeout, llm_admission, LIVE, PRACTICE, HEALTH
+from circuit_breaker import CircuitBreaker, backoff_delay, OPEN
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE = os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-pro-latest')
+# Cheap model used by the health probes
+GEMINI_PROBE_MODEL = os.getenv('GEMINI_PROBE_MODEL', 'gemini-2.0-flash')
+
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5.0))
+LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 60.0))
+LLM_PROBE_TIMEOUT = float(os.getenv('LLM_PROBE_TIMEOUT', 10.0))
+# Keep-alive connections kept open to the API
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 10))
+# Retries of transient failures (transport errors, 429, 5xx), with
+# exponential backoff and full jitter between attempts
+LLM_RETRIES = int(os.getenv('LLM_RETRIES', 2))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 0.5))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 8.0))
+
+
+class LLMError(Exception):
+    """A Gemini call failed: transport error, error status or no usable text.
+
+    retryable marks failures that say the provider is struggling (transport
+    errors, 429, 5xx) rather than that the request itself was bad; only
+    these are retried and count against the circuit breaker.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        if retryable is None:
+            retryable = status_code is None or status_code == 429 or status_code >= 500
+        self.retryable = retryable
+
+
+class LLMBusyError(LLMError):
+    """No admission slot within the queue timeout; the call was never sent"""
+
+    def __init__(self, message: str):
+        super().__init__(message, 429, retryable=False)
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open: Gemini has been failing, so the call wasn't made"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Gemini is unavailable (circuit open, retrying in {retry_in:.0f}s)", retryable=False)
+        self.retry_in = retry_in
+
+
+def _error_message(response: requests.Response) -> str:
+    try:
+        return response.json().get('error', {}).get('message') or response.reason
+    except ValueError:
+        return response.reason or f"HTTP {response.status_code}"
+
+
+class GeminiClient:
+    """The process's single Gemini client.
+
+    Owns the configured model (name and generation settings) and one pooled
+    keep-alive HTTP session, so calls reuse warm TLS connections instead of
+    building a model object and a connection per request. Every call has a
+    connect and a read timeout. Calls go over requests, which gevent makes
+    cooperative, so a slow generation only parks the calling greenlet.
+
+    Identical prompts issued while one is already in flight (a double-submitted
+    answer, two participants asking for the next question) are single-flighted:
+    they wait for the first call and share its text or its error.
+
+    Every call is admitted by the shared AdmissionController first (quota
+    token bucket, in-flight cap, priority queue); callers pass the priority
+    class of the work (LIVE, PRACTICE or HEALTH). Transient failures are
+    retried with jittered exponential backoff, and a circuit breaker makes
+    calls fail fast with CircuitOpenError while Gemini keeps failing.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model_name: str = GEMINI_MODEL,
+                 probe_model: str = GEMINI_PROBE_MODEL, connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 read_timeout: float = LLM_READ_TIMEOUT, pool_size: int = LLM_POOL_SIZE,
+                 generation_config: Optional[Dict[str, Any]] = None,
+                 admission: Optional[AdmissionController] = None, breaker: Optional[CircuitBreaker] = None,
+                 retries: int = LLM_RETRIES):
+        self._api_key = api_key
+        self.model_name = model_name
+        self.probe_model = probe_model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self.generation_config = generation_config or {}
+        self.admission = admission or llm_admission
+        self.breaker = breaker or CircuitBreaker(name='Gemini')
+        self.retries = max(0, retries)
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+        # prompt -> AsyncResult of the call currently generating it
+        self._in_flight: Dict[str, AsyncResult] = {}
+        self.calls = 0
+        self.errors = 0
+        self.collapsed = 0
+        self.retried = 0
+        self.streams = 0
+        self._latency_total = 0.0
+        self._first_chunk_total = 0.0
+
+    @property
+    def api_key(self) -> Optional[str]:
+        # Read lazily so .env has been loaded by the time the first call is made
+        return self._api_key or os.getenv('GOOGLE_API_KEY')
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # Retries are the caller's decision; the adapter only pools connections
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.headers.update({'Content-Type': 'application/json'})
+                    self._session = session
+        return self._session
+
+    def _request(self, model: str, method: str, payload: Dict[str, Any], timeout: Optional[float] = None,
+                 stream: bool = False) -> requests.Response:
+        api_key = self.api_key
+        if not api_key:
+            raise LLMError("GOOGLE_API_KEY environment variable not set")
+
+        url = f"{GEMINI_API_BASE}/models/{model}:{method}"
+        try:
+            response = self.session.post(url, json=payload, headers={'x-goog-api-key': api_key},
+                                         params={'alt': 'sse'} if stream else None, stream=stream,
+                                         timeout=(self.connect_timeout, timeout or self.read_timeout))
+        except requests.RequestException as e:
+            raise LLMError(f"Gemini request failed: {e}") from e
+
+        if response.status_code != 200:
+            message = _error_message(response)
+            response.close()
+            raise LLMError(message, response.status_code)
+        return response
+
+    def _post(self, model: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        response = self._request(model, 'generateContent', payload, timeout)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise LLMError("Gemini returned invalid JSON", response.status_code) from e
+
+    @staticmethod
+    def _text(data: Dict[str, Any]) -> str:
+        candidates = data.get('candidates') or []
+        if not candidates:
+            reason = (data.get('promptFeedback') or {}).get('blockReason')
+            raise LLMError(f"Empty response from Gemini{f' (blocked: {reason})' if reason else ''}",
+                           retryable=not reason)
+        parts = (candidates[0].get('content') or {}).get('parts') or []
+        return ''.join(part.get('text', '') for part in parts)
+
+    @contextmanager
+    def _guarded(self) -> Iterator[None]:
+        """One call through the circuit breaker, checked before admission.
+
+        While the breaker is open this raises CircuitOpenError at once, so
+        callers neither queue for admission nor spend tokens. The outcome is
+        always settled: provider failures (and unexpected errors) count
+        against the breaker, bad requests still show the provider is up, and
+        calls that never went out or were abandoned just free the half-open
+        trial.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_in())
+        generation = self.breaker.generation
+        settled = False
+        try:
+            yield
+            self.breaker.record_success(generation)
+            settled = True
+        except LLMBusyError:
+            raise
+        except LLMError as e:
+            if e.retryable:
+                self.breaker.record_failure(generation)
+            else:
+                self.breaker.record_success(generation)
+            settled = True
+            raise
+        except Exception:
+            self.breaker.record_failure(generation)
+            settled = True
+            raise
+        finally:
+            if not settled:
+                self.breaker.release(generation)
+
+    def available(self) -> bool:
+        """False while the circuit breaker is open, i.e. calls would fail fast"""
+        return self.breaker.state != OPEN
+
+    @contextmanager
+    def _admitted(self, priority: int) -> Iterator[None]:
+        try:
+            self.admission.acquire(priority)
+        except AdmissionTimeout as e:
+            raise LLMBusyError(str(e)) from e
+        try:
+            yield
+        finally:
+            self.admission.release()
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, priority: int = PRACTICE) -> str:
+        """Text generated by the configured model for prompt; raises LLMError on failure"""
+        flight = self._in_flight.get(prompt)
+        if flight is not None:
+            self.collapsed += 1
+            # The leading call is bounded by its own admission and request
+            # timeouts on every attempt plus the backoff between them; this
+            # only guards against it never completing
+            attempt = self.admission.queue_timeouts.get(priority, 0.0) + self.connect_timeout + (timeout or self.read_timeout)
+            wait = (self.retries + 1) * attempt + self.retries * LLM_BACKOFF_MAX
+            try:
+                return flight.get(timeout=wait + 1.0)
+            except gevent.Timeout:
+                raise LLMError("Timed out waiting for an identical in-flight Gemini call")
+
+        flight = self._in_flight[prompt] = AsyncResult()
+        try:
+            text = self._generate(prompt, timeout, priority)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        except BaseException:
+            # Killed (e.g. the client went away): don't leave followers waiting
+            flight.set_exception(LLMError("Identical in-flight Gemini call was abandoned"))
+            raise
+        else:
+            flight.set(text)
+            return text
+        finally:
+            del self._in_flight[prompt]
+
+    def _payload(self, prompt: str) -> Dict[str, Any]:
+        payload = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+        if self.generation_config:
+            payload['generationConfig'] = self.generation_config
+        return payload
+
+    def _generate(self, prompt: str, timeout: Optional[float], priority: int) -> str:
+        payload = self._payload(prompt)
+
+        attempt = 0
+        while True:
+            try:
+                # Each attempt checks the breaker and is admitted separately,
+                # so backoff sleeps don't hold a slot and retries stop as soon
+                # as the breaker opens
+                with self._guarded(), self._admitted(priority):
+                    return self._attempt(payload, timeout)
+            except LLMError as e:
+                if not e.retryable or attempt >= self.retries:
+                    raise
+                delay = backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX)
+                logger.warning(f"Gemini call failed ({e}); retrying in {delay:.1f}s")
+            attempt += 1
+            self.retried += 1
+            time.sleep(delay)
+
+    def _attempt(self, payload: Dict[str, Any], timeout: Optional[float]) -> str:
+        started = time.perf_counter()
+        self.calls += 1
+        try:
+            text = self._text(self._post(self.model_name, payload, timeout))
+            if not text.strip():
+                raise LLMError("Empty response from Gemini")
+        except LLMError:
+            self.errors += 1
+            raise
+        finally:
+            self._latency_total += time.perf_counter() - started
+        return text
+
+    def stream(self, prompt: str, timeout: Optional[float] = None, priority: int = PRACTICE) -> Iterator[str]:
+        """Text chunks for prompt as the model generates them; raises LLMError on failure.
+
+        Uses streamGenerateContent over server-sent events. The read timeout
+        bounds the gap between chunks rather than the whole generation. The
+        admission slot is held until the stream ends or is closed. Streams
+        aren't retried, since chunks may already have been consumed.
+        """
+        with self._guarded(), self._admitted(priority):
+            yield from self._stream(prompt, timeout)
+
+    def _stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[str]:
+        started = time.perf_counter()
+        self.calls += 1
+        self.streams += 1
+        produced = False
+        try:
+            response = self._request(self.model_name, 'streamGenerateContent', self._payload(prompt), timeout,
+                                     stream=True)
+            with response:
+                response.encoding = 'utf-8'
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line.startswith('data:'):
+                        continue
+                    try:
+                        data = json.loads(line[5:])
+                    except ValueError as e:
+                        raise LLMError("Gemini returned invalid JSON", response.status_code) from e
+                    # Trailing events may carry only usage metadata
+                    if not data.get('candidates') and produced:
+                        continue
+                    text = self._text(data)
+                    if text:
+                        if not produced:
+                            self._first_chunk_total += time.perf_counter() - started
+                            produced = True
+                        yield text
+            if not produced:
+                raise LLMError("Empty response from Gemini")
+        except requests.RequestException as e:
+            self.errors += 1
+            raise LLMError(f"Gemini stream failed: {e}") from e
+        except LLMError:
+            self.errors += 1
+            raise
+        finally:
+            self._latency_total += time.perf_counter() - started
+
+    def probe(self) -> Dict[str, Any]:
+        """Minimal request to check the API key and service; never raises"""
+        started = time.perf_counter()
+        try:
+            # While half-open, a probe can be the trial call that closes the breaker
+            with self._guarded(), self._admitted(HEALTH):
+                self._post(self.probe_model, {'contents': [{'parts': [{'text': 'test'}]}]}, LLM_PROBE_TIMEOUT)
+            return {'ok': True, 'error': None, 'latency_ms': round((time.perf_counter() - started) * 1000.0, 1)}
+        except LLMError as e:
+            return {'ok': False, 'error': str(e), 'status_code': e.status_code,
+                    'latency_ms': round((time.perf_counter() - started) * 1000.0, 1)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'model': self.model_name,
+            'calls': self.calls,
+            'errors': self.errors,
+            'collapsed': self.collapsed,
+            'retried': self.retried,
+            'in_flight': len(self._in_flight),
+            'mean_latency_ms': round(self._latency_total / self.calls * 1000.0, 1) if self.calls else 0.0,
+            'streams': self.streams,
+            'mean_first_chunk_ms': round(self._first_chunk_total / self.streams * 1000.0, 1) if self.streams else 0.0,
+            'admission': self.admission.stats(),
+            'breaker': self.breaker.stats()
+        }
+
+
+# Shared client instance
+llm_client = GeminiClient()
@@ -0,0 +1,196 @@
+import os
+import logging
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+import gevent
+from gevent.event import AsyncResult
+
+from search_pool import search_pool, SearchPool, SearchPoolTimeout
+from embedding_cache import embedding_cache, result_cache, normalize_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv('EMBED_BATCH_MAX_SIZE', 32))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv('EMBED_BATCH_MAX_WAIT_MS', 5))
+
+
+class _PendingQuery:
+    __slots__ = ('store', 'text', 'role', 'k', 'exclude', 'vector', 'result')
+
+    def __init__(self, store, text: Optional[str], role: Optional[str], k: int,
+                 exclude: FrozenSet[int] = frozenset(), vector=None):
+        self.store = store
+        self.text = text
+        self.role = role
+        self.k = k
+        self.exclude = exclude
+        self.vector = vector
+        self.result = AsyncResult()
+
+    @property
+    def result_key(self):
+        return (self.store.key, self.role, self.k, self.text)
+
+    @property
+    def embedding_key(self):
+        return (self.store.fingerprint, self.text)
+
+
+class QueryBatcher:
+    """Coalesces concurrent similarity searches into batched embed + search calls.
+
+    Queries that arrive within max_wait of each other (or until max_batch are
+    queued) are embedded as a single batch and searched with one FAISS call per
+    role partition; each waiting greenlet then receives its own hits. All state
+    is only touched from greenlets on the hub, so no locking is needed.
+    """
+
+    def __init__(self, pool: SearchPool = search_pool, max_batch: int = EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: List[_PendingQuery] = []
+        self._timer = None
+        self.batches = 0
+        self.queries = 0
+        self.batch_sizes: Counter = Counter()
+
+    def search(self, store, text: str, role: Optional[str] = None, k: int = 3,
+               vector: Optional[np.ndarray] = None, exclude: FrozenSet[int] = frozenset()) -> List[Tuple[int, float]]:
+        """Top-k (question id, distance) pairs for text, batched with concurrent callers.
+
+        If a query vector is given it is searched as-is (e.g. a room's context
+        centroid) and text is ignored; such queries bypass both caches. Ids in
+        exclude are never returned; those queries skip the result cache.
+        """
+        exclude = frozenset(exclude)
+        if vector is not None:
+            pending = _PendingQuery(store, None, role, k, exclude, vector)
+        else:
+            pending = _PendingQuery(store, normalize_text(text), role, k, exclude)
+
+            # Repeated contexts and filler transcripts skip embedding and search
+            hits = result_cache.get(pending.result_key) if not exclude else None
+            if hits is not None:
+                return list(hits)
+            pending.vector = embedding_cache.get(pending.embedding_key)
+
+        if not self.pool.cooperative() or self.max_batch == 1:
+            batch = [pending]
+            self._remember(batch, self.pool.run(self._run_batch, batch))
+            return pending.result.get()
+
+        self._queue.append(pending)
+
+        if len(self._queue) >= self.max_batch:
+            self._flush_soon(0)
+        elif self._timer is None:
+            self._flush_soon(self.max_wait)
+
+        # The pool enforces its own timeout once the batch is dispatched; this
+        # only guards against the batch never being dispatched at all
+        try:
+            return pending.result.get(timeout=self.max_wait + self.pool.timeout + 1.0)
+        except gevent.Timeout:
+            raise SearchPoolTimeout("Batched search did not complete in time")
+
+    def embed(self, store, text: str) -> np.ndarray:
+        """Embedding for a single text, from the cache or one pool call"""
+        key = (store.fingerprint, normalize_text(text))
+        vector = embedding_cache.get(key)
+        if vector is None:
+            vector = self.pool.run(store.embed_texts, [key[1]])[0]
+            embedding_cache.put(key, vector)
+        return vector
+
+    def _flush_soon(self, delay: float):
+        if self._timer is not None:
+            self._timer.kill(block=False)
+        self._timer = gevent.spawn_later(delay, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        queue, self._queue = self._queue, []
+
+        # Normally a single store, but a reload can briefly leave two in flight
+        by_store = defaultdict(list)
+        for pending in queue:
+            by_store[id(pending.store)].append(pending)
+
+        for items in by_store.values():
+            for start in range(0, len(items), self.max_batch):
+                gevent.spawn(self._dispatch, items[start:start + self.max_batch])
+
+    def _dispatch(self, batch: List[_PendingQuery]):
+        self.batches += 1
+        self.queries += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        try:
+            results = self.pool.run(self._run_batch, batch)
+        except Exception as e:
+            for pending in batch:
+                pending.result.set_exception(e)
+            return
+
+        self._remember(batch, results)
+
+    @staticmethod
+    def _remember(batch: List[_PendingQuery], results):
+        """Cache new embeddings and hits (on the hub, not in the pool thread) and wake callers"""
+        vectors, hits = results
+        for row, pending in enumerate(batch):
+            if pending.text is not None:
+                if pending.vector is None:
+                    embedding_cache.put(pending.embedding_key, vectors[row])
+                if not pending.exclude:
+                    result_cache.put(pending.result_key, tuple(hits[row]))
+            pending.result.set(hits[row])
+
+    @staticmethod
+    def _run_batch(batch: List[_PendingQuery]):
+        """Runs in a pool thread: one embedding pass for uncached texts, one search per role/exclusion group"""
+        store = batch[0].store
+        missing = [row for row, pending in enumerate(batch) if pending.vector is None]
+        embedded = store.embed_texts([batch[row].text for row in missing]) if missing else None
+
+        vectors = np.empty((len(batch), store.dimension), dtype='float32')
+        for row, pending in enumerate(batch):
+            if pending.vector is not None:
+                vectors[row] = pending.vector
+        if missing:
+            vectors[missing] = embedded
+
+        # Queries share a FAISS call when they search the same partition with
+        # the same exclusions (usually none)
+        groups = defaultdict(list)
+        for row, pending in enumerate(batch):
+            groups[(pending.role, pending.exclude)].append(row)
+
+        results: List[Any] = [None] * len(batch)
+        for (role, exclude), rows in groups.items():
+            k = max(batch[row].k for row in rows)
+            hits = store.search_vectors(vectors[rows], k, role, exclude)
+            for row, row_hits in zip(rows, hits):
+                results[row] = row_hits[:batch[row].k]
+        return vectors, results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches': self.batches,
+            'queries': self.queries,
+            'queued': len(self._queue),
+            'avg_batch_size': self.queries / self.batches if self.batches else 0.0,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            'embedding_cache': embedding_cache.stats(),
+            'result_cache': result_cache.stats()
+        }
+
+
+# Shared batcher in front of the embedding model
+query_batcher = QueryBatcher()
@@ -0,0 +1,286 @@
+import os
+import json
+import random
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from search_pool import search_pool
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS_PATH = os.path.join(BASE_DIR, 'frontend', 'assets', 'questions.json')
+# Questions imported by ingest.py, one JSON object per line, merged into the catalog
+CORPUS_PATH = os.getenv('QUESTION_CORPUS_PATH', os.path.join(BASE_DIR, 'data', 'corpus', 'questions.jsonl'))
+
+# How often (in seconds) the file's mtime is checked for changes
+RELOAD_CHECK_INTERVAL = float(os.getenv('QUESTION_CATALOG_CHECK_INTERVAL', 1.0))
+
+
+def question_id(role: str, text: str) -> int:
+    """Stable 63-bit id for a question, derived from its role and text"""
+    digest = hashlib.blake2b(f"{role}\x1f{text}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') & 0x7FFFFFFFFFFFFFFF
+
+
+class Question(NamedTuple):
+    id: int
+    role: str
+    text: str
+    topics: Tuple[str, ...] = ()
+    difficulty: Optional[str] = None
+
+
+class CatalogSnapshot:
+    """Immutable, fully-indexed view of one version of questions.json and the ingested corpus"""
+
+    def __init__(self, version: tuple, job_roles: list, corpus: Iterable[dict] = ()):
+        self.version = version
+        self.roles: Dict[str, Tuple[Question, ...]] = {}
+        self.texts: Dict[str, Tuple[str, ...]] = {}
+        self.by_id: Dict[int, Question] = {}
+        by_role: Dict[str, List[Question]] = {}
+
+        for role_data in job_roles:
+            if not isinstance(role_data, dict):
+                logger.warning("Skipping invalid role_data entry")
+                continue
+
+            role = role_data.get('role')
+            questions = role_data.get('questions', [])
+            if not role or not isinstance(questions, list):
+                logger.warning(f"Skipping invalid role entry: {role}")
+                continue
+
+            entries = by_role.setdefault(role, [])
+            for text in questions:
+                if not text or not isinstance(text, str):
+                    continue
+                self._add(entries, Question(question_id(role, text), role, text))
+
+        for record in corpus:
+            role, text = record.get('role'), record.get('text')
+            if not role or not text:
+                continue
+            question = Question(question_id(role, text), role, text, tuple(record.get('topics') or ()),
+                                record.get('difficulty'))
+            self._add(by_role.setdefault(role, []), question)
+
+        for role, entries in by_role.items():
+            self.roles[role] = tuple(entries)
+            self.texts[role] = tuple(q.text for q in entries)
+
+        self.default_role = next(iter(self.roles), None)
+
+    def _add(self, entries: List[Question], question: Question):
+        if question.id not in self.by_id:
+            self.by_id[question.id] = question
+            entries.append(question)
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+class QuestionCatalog:
+    """Process-wide question catalog that reloads when the file changes on disk.
+
+    Only the first load happens inline. Later reloads (e.g. after a bulk
+    ingest grew the corpus) run as background work in the search pool, and
+    readers keep getting the previous snapshot until the new one is swapped in.
+    """
+
+    def __init__(self, path: str = QUESTIONS_PATH, check_interval: float = RELOAD_CHECK_INTERVAL,
+                 corpus_path: Optional[str] = CORPUS_PATH):
+        self.path = path
+        self.corpus_path = corpus_path
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._next_check = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def _file_version(self) -> Optional[Tuple[int, ...]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        try:
+            corpus = os.stat(self.corpus_path) if self.corpus_path else None
+        except OSError:
+            corpus = None
+        corpus_version = (corpus.st_mtime_ns, corpus.st_size) if corpus else (0, 0)
+        return (stat.st_mtime_ns, stat.st_size) + corpus_version
+
+    def content_digest(self):
+        """SHA-256 of questions.json followed by the corpus file.
+
+        Returned unfinished so an appender can extend it with the bytes it
+        writes. Without a corpus this is just the hash of questions.json.
+        """
+        digest = hashlib.sha256()
+        for path in (self.path, self.corpus_path):
+            if not path or not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return digest
+
+    def content_sha256(self) -> str:
+        """Hash identifying the catalog's contents on disk"""
+        return self.content_digest().hexdigest()
+
+    def _read_corpus(self) -> List[dict]:
+        records = []
+        if not self.corpus_path:
+            return records
+        try:
+            f = open(self.corpus_path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return records
+        with f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted ingest; it is re-ingested on resume
+                    logger.warning(f"Skipping malformed line {number} in {self.corpus_path}")
+        return records
+
+    def _load(self, version: Tuple[int, ...]) -> Optional[CatalogSnapshot]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON in questions.json: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error reading questions.json: {e}")
+            return None
+
+        if not isinstance(data, dict) or not isinstance(data.get('job_roles'), list):
+            logger.error("questions.json must be a dictionary with a 'job_roles' list")
+            return None
+
+        return CatalogSnapshot(version, data['job_roles'], self._read_corpus())
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """Return the current snapshot, reloading first if the file has changed"""
+        now = time.monotonic()
+        if self._snapshot is not None and now < self._next_check:
+            return self._snapshot
+
+        with self._lock:
+            if self._snapshot is not None and now < self._next_check:
+                return self._snapshot
+            self._next_check = now + self.check_interval
+
+            version = self._file_version()
+            if version is None:
+                if self._snapshot is None:
+                    logger.error(f"Question file not found at {self.path}")
+                return self._snapshot
+
+            if self._snapshot is None:
+                self._swap(self._load(version))
+            elif self._snapshot.version != version and not self._reloading:
+                self._reloading = True
+                try:
+                    search_pool.submit(self._reload, version)
+                except Exception as e:
+                    self._reloading = False
+                    logger.error(f"Could not start question catalog reload: {e}")
+
+            return self._snapshot
+
+    def _reload(self, version: Tuple[int, ...]):
+        try:
+            self._swap(self._load(version))
+        finally:
+            self._reloading = False
+            # Look again straight away in case the files changed during the reload
+            self._next_check = 0.0
+
+    def _swap(self, snapshot: Optional[CatalogSnapshot]):
+        if snapshot is not None:
+            # Swap the whole snapshot in one assignment so readers never
+            # observe a half-built catalog
+            self._snapshot = snapshot
+            logger.info(f"Question catalog loaded with {len(snapshot)} questions")
+
+    @property
+    def version(self) -> Optional[Tuple[int, ...]]:
+        snapshot = self.snapshot()
+        return snapshot.version if snapshot else None
+
+    def roles(self) -> List[str]:
+        snapshot = self.snapshot()
+        return list(snapshot.roles) if snapshot else []
+
+    def default_role(self) -> Optional[str]:
+        snapshot = self.snapshot()
+        return snapshot.default_role if snapshot else None
+
+    def questions_for(self, role: Optional[str], fallback: bool = True) -> Tuple[str, ...]:
+        """Question texts for a role, falling back to the default role if unknown"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return ()
+
+        questions = snapshot.texts.get(role) if role else None
+        if not questions and fallback and snapshot.default_role:
+            questions = snapshot.texts[snapshot.default_role]
+        return questions or ()
+
+    def random_question(self, role: Optional[str]) -> Optional[str]:
+        questions = self.questions_for(role)
+        return random.choice(questions) if questions else None
+
+    def random_entry(self, role: Optional[str], exclude: FrozenSet[int] = frozenset()) -> Optional[Question]:
+        """Random question for a role (default role if unknown), avoiding excluded ids while any are left"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+
+        questions = snapshot.roles.get(role) if role else None
+        if not questions and snapshot.default_role:
+            questions = snapshot.roles[snapshot.default_role]
+        if not questions:
+            return None
+
+        question = random.choice(questions)
+        if question.id in exclude:
+            fresh = [candidate for candidate in questions if candidate.id not in exclude]
+            if fresh:
+                question = random.choice(fresh)
+        return question
+
+    def get(self, qid: int) -> Optional[Question]:
+        snapshot = self.snapshot()
+        return snapshot.by_id.get(qid) if snapshot else None
+
+    def find(self, text: str, role: Optional[str] = None) -> Optional[Question]:
+        """The catalog question with exactly this text, preferring the given role"""
+        snapshot = self.snapshot()
+        if snapshot is None or not text:
+            return None
+        for candidate in ([role] if role else []) + list(snapshot.roles):
+            question = snapshot.by_id.get(question_id(candidate, text))
+            if question is not None:
+                return question
+        return None
+
+    def all_questions(self) -> List[Question]:
+        snapshot = self.snapshot()
+        return list(snapshot.by_id.values()) if snapshot else []
+
+
+# Shared catalog instance
+catalog = QuestionCatalog()
@@ -0,0 +1,406 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+import traceback
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+import faiss
+
+from question_catalog import BASE_DIR
+from ann_index import search_params
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout changes so old tables are rebuilt
+GRAPH_FORMAT_VERSION = 1
+
+GRAPH_DIR = os.getenv('QUESTION_GRAPH_DIR', os.path.join(BASE_DIR, 'data', 'question_graph'))
+# Neighbours kept per question; follow-ups skip asked ones, so keep some slack
+GRAPH_NEIGHBOURS = int(os.getenv('QUESTION_GRAPH_NEIGHBOURS', 16))
+# Above this share of changed questions a refresh rebuilds the whole table
+_REBUILD_FRACTION = 0.5
+# Queries per FAISS search call while building
+_SEARCH_BATCH = 4096
+
+IDS_FILE = 'ids.npy'
+NEIGHBOURS_FILE = 'neighbours.npy'
+DISTANCES_FILE = 'distances.npy'
+META_FILE = 'meta.json'
+
+
+class _GraphState:
+    """One consistent version of the adjacency table.
+
+    ids is sorted; row i of neighbours holds the ids of question ids[i]'s
+    nearest same-role questions, closest first, padded with -1, and the same
+    row of distances their squared L2 distances.
+    """
+
+    __slots__ = ('ids', 'neighbours', 'distances', 'meta')
+
+    def __init__(self, ids: np.ndarray, neighbours: np.ndarray, distances: np.ndarray, meta: dict):
+        self.ids = ids
+        self.neighbours = neighbours
+        self.distances = distances
+        self.meta = meta
+
+
+def _role_vectors(vector_index, role: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Ids and vectors of a role partition, in partition order"""
+    partition = vector_index.partitions[role]
+    ids = faiss.vector_to_array(partition.id_map)
+    vectors = partition.index.reconstruct_n(0, partition.ntotal)
+    return ids, np.ascontiguousarray(vectors, dtype='float32')
+
+
+def _nearest(vector_index, role: str, query_ids: np.ndarray, neighbours: int,
+             role_data: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest same-role neighbours of the given questions, excluding themselves"""
+    partition = vector_index.partitions[role]
+    ids, vectors = role_data or _role_vectors(vector_index, role)
+    order = np.argsort(ids)
+    rows = order[np.searchsorted(ids, query_ids, sorter=order)]
+    queries = np.ascontiguousarray(vectors[rows])
+
+    k = min(neighbours + 1, partition.ntotal)
+    found_ids = np.full((len(query_ids), neighbours), -1, dtype='int64')
+    found_distances = np.full((len(query_ids), neighbours), np.inf, dtype='float32')
+    for start in range(0, len(queries), _SEARCH_BATCH):
+        batch = queries[start:start + _SEARCH_BATCH]
+        distances, labels = partition.search(batch, k, params=search_params(partition, k))
+        # Move each query's own hit (and empty slots) to the end of its row, keeping order
+        drop = (labels == query_ids[start:start + len(batch), None]) | (labels == -1)
+        order = np.argsort(drop, axis=1, kind='stable')[:, :neighbours]
+        labels = np.take_along_axis(np.where(drop, -1, labels), order, axis=1)
+        distances = np.take_along_axis(np.where(drop, np.inf, distances), order, axis=1)
+        found_ids[start:start + len(batch), :labels.shape[1]] = labels
+        found_distances[start:start + len(batch), :distances.shape[1]] = distances
+    return found_ids, found_distances
+
+
+class QuestionGraph:
+    """Precomputed question -> nearest questions table for instant follow-ups.
+
+    Built offline from the vector index (each question's nearest neighbours
+    within its role) and stored as flat numpy arrays that are memory-mapped
+    on load, so a follow-up is a binary search over the sorted ids and a row
+    read, with no embedding model or index search in the request path.
+    Refreshes publish a new state in one assignment, like QuestionVectorIndex.
+    """
+
+    def __init__(self, state: _GraphState):
+        self._state = state
+        self._update_lock = threading.Lock()
+
+    @property
+    def meta(self) -> dict:
+        return self._state.meta
+
+    @property
+    def index_key(self) -> Optional[str]:
+        return self.meta.get('index_key')
+
+    @property
+    def neighbours(self) -> int:
+        return self.meta['neighbours']
+
+    def __len__(self):
+        return len(self._state.ids)
+
+    @classmethod
+    def build(cls, vector_index, neighbours: int = GRAPH_NEIGHBOURS) -> 'QuestionGraph':
+        """Compute the table for every question in the vector index"""
+        started = time.perf_counter()
+        all_ids, all_neighbours, all_distances = [], [], []
+        for role in vector_index.partitions:
+            role_data = _role_vectors(vector_index, role)
+            found_ids, found_distances = _nearest(vector_index, role, role_data[0], neighbours, role_data)
+            all_ids.append(role_data[0])
+            all_neighbours.append(found_ids)
+            all_distances.append(found_distances)
+
+        graph = cls(cls._sorted_state(all_ids, all_neighbours, all_distances,
+                                      cls._meta(vector_index, neighbours)))
+        logger.info(f"Question graph built for {len(graph)} questions in {time.perf_counter() - started:.1f}s")
+        return graph
+
+    @staticmethod
+    def _meta(vector_index, neighbours: int) -> dict:
+        return {
+            'format_version': GRAPH_FORMAT_VERSION,
+            'index_key': vector_index.key,
+            'embedding_fingerprint': vector_index.fingerprint,
+            'neighbours': neighbours,
+            'count': len(vector_index),
+            'updated_at': time.time()
+        }
+
+    @staticmethod
+    def _sorted_state(ids: List[np.ndarray], neighbours: List[np.ndarray], distances: List[np.ndarray],
+                      meta: dict) -> _GraphState:
+        width = meta['neighbours']
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype='int64')
+        neighbours = np.concatenate(neighbours) if neighbours else np.empty((0, width), dtype='int64')
+        distances = np.concatenate(distances) if distances else np.empty((0, width), dtype='float32')
+        order = np.argsort(ids, kind='stable')
+        meta = dict(meta, count=len(ids))
+        return _GraphState(ids[order], neighbours[order], distances[order].astype('float16'), meta)
+
+    def _row(self, state: _GraphState, qid: int) -> Optional[int]:
+        row = int(np.searchsorted(state.ids, qid))
+        if row < len(state.ids) and state.ids[row] == qid:
+            return row
+        return None
+
+    def follow_ups(self, qid: int, k: int = 1, exclude: FrozenSet[int] = frozenset()) -> List[Tuple[int, float]]:
+        """Up to k (question id, distance) nearest to qid, closest first, skipping excluded ids"""
+        state = self._state
+        row = self._row(state, qid)
+        if row is None:
+            return []
+
+        results = []
+        for neighbour, distance in zip(state.neighbours[row].tolist(), state.distances[row].tolist()):
+            if neighbour == -1:
+                break
+            if neighbour in exclude:
+                continue
+            results.append((neighbour, distance))
+            if len(results) >= k:
+                break
+        return results
+
+    def sync(self, vector_index) -> bool:
+        """Bring the table in line with the vector index, recomputing only affected rows.
+
+        Rows are recomputed for added questions, for questions that listed a
+        removed one, and for questions an added one is now closer to than
+        their current furthest neighbour. Returns True if anything changed.
+        """
+        with self._update_lock:
+            state = self._state
+            if state.meta.get('index_key') == vector_index.key:
+                return False
+
+            neighbours = self.neighbours
+            questions = vector_index.questions
+            current_ids = np.fromiter(questions.keys(), dtype='int64', count=len(questions))
+            added = np.setdiff1d(current_ids, state.ids)
+            removed = np.setdiff1d(state.ids, current_ids)
+            meta = self._meta(vector_index, neighbours)
+
+            if not len(added) and not len(removed):
+                self._state = _GraphState(state.ids, state.neighbours, state.distances, meta)
+                return False
+
+            if len(added) + len(removed) > _REBUILD_FRACTION * max(len(state.ids), 1):
+                self._state = QuestionGraph.build(vector_index, neighbours)._state
+                return True
+
+            started = time.perf_counter()
+            keep = ~np.isin(state.ids, removed)
+            ids = state.ids[keep]
+            table = np.array(state.neighbours[keep])
+            distances = np.array(state.distances[keep], dtype='float32')
+
+            stale = np.isin(table, removed).any(axis=1)
+            affected = set(ids[stale].tolist())
+            by_role: Dict[str, List[int]] = {}
+            for qid in added.tolist():
+                by_role.setdefault(questions[qid][0], []).append(qid)
+
+            # Existing questions the new ones displace a neighbour of
+            worst = distances[:, -1]
+            for role, role_added in by_role.items():
+                found_ids, found_distances = _nearest(vector_index, role, np.array(role_added, dtype='int64'), neighbours)
+                candidates = found_ids.ravel()
+                valid = candidates != -1
+                rows = np.searchsorted(ids, candidates[valid])
+                rows = np.minimum(rows, max(len(ids) - 1, 0))
+                hit = (ids[rows] == candidates[valid]) if len(ids) else np.zeros(0, dtype=bool)
+                closer = found_distances.ravel()[valid][hit] < worst[rows[hit]]
+                affected.update(candidates[valid][hit][closer].tolist())
+
+            for qid in affected:
+                by_role.setdefault(questions[qid][0], []).append(qid)
+
+            new_ids, new_neighbours, new_distances = [], [], []
+            for role, role_ids in by_role.items():
+                role_ids = np.array(role_ids, dtype='int64')
+                found_ids, found_distances = _nearest(vector_index, role, role_ids, neighbours)
+                new_ids.append(role_ids)
+                new_neighbours.append(found_ids)
+                new_distances.append(found_distances)
+
+            recomputed = np.concatenate(new_ids)
+            untouched = ~np.isin(ids, recomputed)
+            self._state = self._sorted_state(
+                [ids[untouched]] + new_ids,
+                [table[untouched]] + new_neighbours,
+                [distances[untouched]] + new_distances,
+                meta
+            )
+
+        logger.info(f"Question graph updated: {len(added)} added, {len(removed)} removed, "
+                    f"{len(recomputed)} rows recomputed in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def save(self, directory: str = GRAPH_DIR) -> str:
+        """Write the table atomically to <directory>/<vector index key>"""
+        state = self._state
+        key = state.meta['index_key']
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, key)
+        staging = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        np.save(os.path.join(staging, IDS_FILE), np.asarray(state.ids))
+        np.save(os.path.join(staging, NEIGHBOURS_FILE), np.asarray(state.neighbours))
+        np.save(os.path.join(staging, DISTANCES_FILE), np.asarray(state.distances))
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(state.meta, f)
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+
+        # Drop tables for older versions of the same index; tables for other
+        # models may still be in use by another process
+        for updated_at, name in _tables(directory, state.meta['embedding_fingerprint'], state.meta['neighbours']):
+            if name != key and updated_at <= state.meta.get('updated_at', 0):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        logger.info(f"Question graph saved to {target}")
+        return target
+
+    @classmethod
+    def load(cls, key: str, directory: str = GRAPH_DIR) -> Optional['QuestionGraph']:
+        """Load the table for a vector index key, memory-mapping the arrays"""
+        path = os.path.join(directory, key)
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('format_version') != GRAPH_FORMAT_VERSION:
+                logger.warning(f"Ignoring incompatible question graph at {path}")
+                return None
+
+            ids = np.load(os.path.join(path, IDS_FILE), mmap_mode='r')
+            neighbours = np.load(os.path.join(path, NEIGHBOURS_FILE), mmap_mode='r')
+            distances = np.load(os.path.join(path, DISTANCES_FILE), mmap_mode='r')
+            if not (len(ids) == len(neighbours) == len(distances) == meta.get('count')):
+                logger.warning(f"Question graph at {path} is inconsistent, rebuilding")
+                return None
+
+            logger.info(f"Question graph loaded from {path} ({len(ids)} questions)")
+            return cls(_GraphState(ids, neighbours, distances, meta))
+
+        except Exception as e:
+            logger.error(f"Error loading question graph: {e}")
+            return None
+
+
+def _tables(directory: str, fingerprint: str, neighbours: int) -> List[Tuple[float, str]]:
+    """(last update time, name) of each table built from the same embeddings with the same width"""
+    if not os.path.isdir(directory):
+        return []
+
+    candidates = []
+    for name in os.listdir(directory):
+        meta_path = os.path.join(directory, name, META_FILE)
+        if '.tmp-' in name or not os.path.exists(meta_path):
+            continue
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            continue
+        if (meta.get('format_version') == GRAPH_FORMAT_VERSION
+                and meta.get('embedding_fingerprint') == fingerprint
+                and meta.get('neighbours') == neighbours):
+            candidates.append((meta.get('updated_at') or 0, name))
+    return candidates
+
+
+def _latest_table(directory: str, fingerprint: str, neighbours: int) -> Optional[str]:
+    """Most recent table built from the same embeddings with the same width, if any"""
+    candidates = _tables(directory, fingerprint, neighbours)
+    return max(candidates)[1] if candidates else None
+
+
+def get_question_graph(vector_index, directory: str = GRAPH_DIR, neighbours: int = GRAPH_NEIGHBOURS,
+                       force_rebuild: bool = False) -> Optional[QuestionGraph]:
+    """Load the table for the vector index, refreshing an older one or building it if needed"""
+    if vector_index is None or not len(vector_index):
+        return None
+
+    graph = None
+    if not force_rebuild:
+        graph = QuestionGraph.load(vector_index.key, directory)
+        if graph is not None and graph.neighbours == neighbours:
+            return graph
+
+        previous = _latest_table(directory, vector_index.fingerprint, neighbours)
+        graph = QuestionGraph.load(previous, directory) if previous else None
+
+    if graph is not None:
+        graph.sync(vector_index)
+    else:
+        graph = QuestionGraph.build(vector_index, neighbours)
+
+    try:
+        graph.save(directory)
+    except Exception as e:
+        # The in-memory table still serves lookups
+        logger.error(f"Error saving question graph: {e}")
+    return graph
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from embedding_backends import BACKENDS, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+    from question_catalog import QUESTIONS_PATH, QuestionCatalog
+    from vector_index import INDEX_DIR, get_question_index
+
+    parser = argparse.ArgumentParser(description="Manage the precomputed question neighbour graph")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Build or refresh the graph for the current vector index")
+    build_parser.add_argument('--questions', default=QUESTIONS_PATH, help="Path to questions.json")
+    build_parser.add_argument('--index-dir', default=INDEX_DIR, help="Vector index artifact directory")
+    build_parser.add_argument('--output', default=GRAPH_DIR, help="Graph directory")
+    build_parser.add_argument('--neighbours', type=int, default=GRAPH_NEIGHBOURS, help="Neighbours per question")
+    build_parser.add_argument('--model', default=EMBEDDING_MODEL_NAME, help="Embedding model name")
+    build_parser.add_argument('--backend', default=EMBEDDING_BACKEND, choices=BACKENDS, help="Embedding backend")
+    build_parser.add_argument('--force', action='store_true', help="Rebuild instead of refreshing incrementally")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        started = time.perf_counter()
+        vector_index = get_question_index(catalog=QuestionCatalog(args.questions), directory=args.index_dir,
+                                          model_name=args.model, backend=args.backend)
+        graph = get_question_graph(vector_index, args.output, args.neighbours, args.force)
+        if graph is None:
+            return 1
+        print(f"Question graph for index {graph.index_key} ready with {len(graph)} questions "
+              f"in {time.perf_counter() - started:.1f}s")
+        return 0
+    except Exception as e:
+        logger.error(f"Error building question graph: {e}")
+        logger.error(traceback.format_exc())
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
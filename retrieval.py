@@ -0,0 +1,287 @@
+import os
+import json
+import math
+import heapq
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from question_catalog import BASE_DIR, QuestionCatalog, catalog as default_catalog, question_id
+from keyword_index import tokenize
+from search_pool import SearchPoolBusy, SearchPoolTimeout, search_pool
+from query_batcher import query_batcher
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+QUESTION_BANK_PATH = os.path.join(BASE_DIR, 'frontend', 'assets', 'question_bank.json')
+
+# BM25 parameters
+BM25_K1 = float(os.getenv('BM25_K1', 1.5))
+BM25_B = float(os.getenv('BM25_B', 0.75))
+
+# Reciprocal rank fusion constant and how deep each ranking is fused
+RRF_K = int(os.getenv('RRF_K', 60))
+FUSION_DEPTH = int(os.getenv('RETRIEVAL_FUSION_DEPTH', 20))
+
+# question_bank.json uses short role keys; map the ones that exist in questions.json
+BANK_ROLE_ALIASES = {
+    'fullstack': 'Full-Stack Developer',
+}
+
+
+class Document(NamedTuple):
+    id: int
+    role: str
+    text: str
+    topics: Tuple[str, ...]
+    source: str
+
+
+class RetrievedQuestion(NamedTuple):
+    id: int
+    role: str
+    text: str
+    topics: Tuple[str, ...]
+    score: float
+    sources: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+
+
+def load_bank_documents(path: str = QUESTION_BANK_PATH) -> List[Document]:
+    """Questions (with expected topics) from question_bank.json"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"Error loading question bank: {str(e)}")
+        return []
+
+    documents = []
+    for role_key, role_data in (data.get('roles') or {}).items():
+        role = BANK_ROLE_ALIASES.get(role_key, role_key)
+        for entry in role_data.get('questions', []):
+            text = entry.get('question') if isinstance(entry, dict) else None
+            if not text:
+                continue
+            topics = tuple(entry.get('expected_topics') or ())
+            documents.append(Document(question_id(role, text), role, text, topics, 'question_bank'))
+    return documents
+
+
+class BM25Index:
+    """Precomputed BM25 index over the question catalog and question_bank.json.
+
+    Each posting stores the final BM25 term weight, so scoring a query is a
+    sum over the query terms' posting lists with no per-query length math.
+    Searches notice source changes but rebuild in the background, serving
+    the previous index until the new one is published.
+    """
+
+    def __init__(self, catalog: QuestionCatalog = default_catalog, bank_path: str = QUESTION_BANK_PATH,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.catalog = catalog
+        self.bank_path = bank_path
+        self.k1 = k1
+        self.b = b
+        self.version = None
+        # (postings token -> ((doc id, weight), ...), documents by id, doc tokens by id)
+        self._state: Tuple[Dict[str, Tuple[Tuple[int, float], ...]], Dict[int, Document], Dict[int, frozenset]] = ({}, {}, {})
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def _source_version(self):
+        snapshot = self.catalog.snapshot()
+        try:
+            bank_mtime = os.stat(self.bank_path).st_mtime_ns
+        except OSError:
+            bank_mtime = None
+        return snapshot, (snapshot.version if snapshot else None, bank_mtime)
+
+    def refresh(self) -> bool:
+        """Rebuild the index if either question file has changed"""
+        snapshot, version = self._source_version()
+        if snapshot is None or version == self.version:
+            return False
+
+        with self._lock:
+            if version == self.version:
+                return False
+
+            documents = {}
+            for question in snapshot.by_id.values():
+                documents[question.id] = Document(question.id, question.role, question.text, question.topics, 'questions')
+            for document in load_bank_documents(self.bank_path):
+                documents.setdefault(document.id, document)
+
+            term_freqs = {}
+            for doc_id, document in documents.items():
+                term_freqs[doc_id] = Counter(tokenize(' '.join((document.text,) + document.topics)))
+
+            total = len(documents) or 1
+            avg_length = sum(sum(tf.values()) for tf in term_freqs.values()) / total or 1.0
+            doc_freq = Counter(token for tf in term_freqs.values() for token in tf)
+
+            postings = defaultdict(list)
+            for doc_id, tf in term_freqs.items():
+                norm = self.k1 * (1 - self.b + self.b * sum(tf.values()) / avg_length)
+                for token, count in tf.items():
+                    idf = math.log(1 + (total - doc_freq[token] + 0.5) / (doc_freq[token] + 0.5))
+                    postings[token].append((doc_id, idf * count * (self.k1 + 1) / (count + norm)))
+
+            state = (
+                {token: tuple(entries) for token, entries in postings.items()},
+                documents,
+                {doc_id: frozenset(tf) for doc_id, tf in term_freqs.items()}
+            )
+            self._state = state
+            self.version = version
+
+        logger.info(f"BM25 index built with {len(state[0])} terms over {len(documents)} questions")
+        return True
+
+    def refresh_in_background(self):
+        """Start a rebuild off the request path if either question file has changed.
+
+        Only an index that was never built is built inline, since there is
+        nothing to serve meanwhile.
+        """
+        if self.version is None:
+            self.refresh()
+            return
+        if self._rebuilding:
+            return
+        _, version = self._source_version()
+        if version == self.version or version[0] is None:
+            return
+        self._rebuilding = True
+        try:
+            search_pool.submit(self._rebuild)
+        except Exception as e:
+            self._rebuilding = False
+            logger.error(f"Could not start BM25 rebuild: {str(e)}")
+
+    def _rebuild(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Error rebuilding BM25 index: {str(e)}")
+        finally:
+            self._rebuilding = False
+
+    def document(self, doc_id: int) -> Optional[Document]:
+        return self._state[1].get(doc_id)
+
+    def matched_terms(self, doc_id: int, keywords: List[str]) -> Tuple[str, ...]:
+        tokens = self._state[2].get(doc_id, frozenset())
+        return tuple(token for token in keywords if token in tokens)
+
+    def search(self, text: str, k: int = 3, role: Optional[str] = None,
+               keywords: Optional[List[str]] = None, exclude: FrozenSet[int] = frozenset()) -> List[Tuple[int, float]]:
+        """Top-k (doc id, BM25 score) pairs, preferring documents for the given role and skipping excluded ids"""
+        self.refresh_in_background()
+        postings, documents, _ = self._state
+        if keywords is None:
+            keywords = tokenize(text)
+
+        scores = defaultdict(float)
+        for token in dict.fromkeys(keywords):
+            for doc_id, weight in postings.get(token, ()):
+                scores[doc_id] += weight
+        for doc_id in exclude:
+            scores.pop(doc_id, None)
+
+        if not scores:
+            return []
+
+        # Role questions rank first, then everything else fills any gap
+        def rank_key(item):
+            return (documents[item[0]].role == role, item[1])
+
+        return heapq.nlargest(k, scores.items(), key=rank_key if role else (lambda item: item[1]))
+
+
+class HybridRetriever:
+    """Fuses BM25 and vector rankings with reciprocal rank fusion.
+
+    Falls back to BM25 alone when the vector store isn't loaded, or when the
+    search pool is saturated and a dense search would have to wait.
+    """
+
+    def __init__(self, bm25: BM25Index, rrf_k: int = RRF_K, depth: int = FUSION_DEPTH):
+        self.bm25 = bm25
+        self.rrf_k = rrf_k
+        self.depth = depth
+        self.bm25_only = 0
+        self.hybrid = 0
+
+    def _vector_hits(self, vector_store, text: str, role: Optional[str], depth: int,
+                     vector=None, exclude: FrozenSet[int] = frozenset()) -> List[Tuple[int, float]]:
+        if vector_store is None or query_batcher.pool.saturated():
+            return []
+        try:
+            return query_batcher.search(vector_store, text, role=role, k=depth, vector=vector, exclude=exclude)
+        except (SearchPoolBusy, SearchPoolTimeout) as e:
+            logger.warning(f"Vector search skipped, using BM25 only: {str(e)}")
+            return []
+
+    def search(self, text: str, role: Optional[str] = None, k: int = 3, vector_store=None,
+               vector=None, exclude: FrozenSet[int] = frozenset()) -> List[RetrievedQuestion]:
+        """Top-k questions for text, fused across BM25 and (if available) dense retrieval.
+
+        vector, if given, is used for the dense search instead of embedding text.
+        Questions in exclude (or sharing their text) are filtered inside both
+        searches rather than dropped from the results afterwards.
+        """
+        keywords = list(dict.fromkeys(tokenize(text)))
+        depth = max(k, self.depth)
+
+        rankings = {'bm25': self.bm25.search(text, depth, role, keywords, exclude)}
+        vector_hits = self._vector_hits(vector_store, text, role, depth, vector, exclude)
+        if vector_hits:
+            rankings['vector'] = vector_hits
+            self.hybrid += 1
+        else:
+            self.bm25_only += 1
+
+        fused = defaultdict(float)
+        sources = defaultdict(list)
+        for name, hits in rankings.items():
+            for rank, (doc_id, _) in enumerate(hits):
+                fused[doc_id] += 1.0 / (self.rrf_k + rank + 1)
+                sources[doc_id].append(name)
+
+        candidates = []
+        for doc_id, score in fused.items():
+            document = self.bm25.document(doc_id)
+            # None when the vector index and catalog are briefly out of step during a reload
+            if document is not None:
+                candidates.append((document.role == role, score, document))
+        candidates.sort(key=lambda item: item[:2], reverse=True)
+
+        results = []
+        # The same text can be filed under more than one id (other roles, question_bank.json)
+        seen_texts = {document.text for document in map(self.bm25.document, exclude) if document is not None}
+        for _, score, document in candidates:
+            doc_id = document.id
+            if document.text in seen_texts:
+                continue
+            seen_texts.add(document.text)
+            results.append(RetrievedQuestion(
+                doc_id, document.role, document.text, document.topics, score,
+                tuple(sources[doc_id]), self.bm25.matched_terms(doc_id, keywords)
+            ))
+            if len(results) >= k:
+                break
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {'hybrid': self.hybrid, 'bm25_only': self.bm25_only}
+
+
+# Shared retrieval engine
+bm25_index = BM25Index()
+hybrid_retriever = HybridRetriever(bm25_index)
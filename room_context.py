@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from search_pool import SearchPoolBusy, SearchPoolTimeout
+from query_batcher import query_batcher
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Weight kept by the existing centroid when a new chunk is folded in
+ROOM_CONTEXT_DECAY = float(os.getenv('ROOM_CONTEXT_DECAY', 0.7))
+ROOM_CONTEXT_MAX_ROOMS = int(os.getenv('ROOM_CONTEXT_MAX_ROOMS', 1000))
+ROOM_CONTEXT_IDLE_TTL = float(os.getenv('ROOM_CONTEXT_IDLE_TTL', 2 * 3600))
+# How much of the last context is kept to find where the next one continues
+_TAIL_CHARS = 256
+_ANCHOR_CHARS = 48
+
+
+def new_text(previous: str, current: str) -> str:
+    """The part of current that wasn't in previous.
+
+    Clients send a sliding window over the chat, so the new text is whatever
+    follows the end of the previous window. If the two don't overlap at all
+    the whole of current is new.
+    """
+    if not previous:
+        return current
+    if current.startswith(previous):
+        return current[len(previous):]
+
+    anchor = previous[-_ANCHOR_CHARS:]
+    position = current.rfind(anchor)
+    if position == -1:
+        return current
+    return current[position + len(anchor):]
+
+
+class RoomContext:
+    __slots__ = ('fingerprint', 'tail', 'centroid', 'chunks', 'updated_at')
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.tail = ''
+        self.centroid: Optional[np.ndarray] = None
+        self.chunks = 0
+        self.updated_at = time.monotonic()
+
+
+class RoomContextStore:
+    """Running, exponentially decayed embedding of each room's conversation.
+
+    Only the text added since a room's last request is embedded, so the cost
+    of a next-question query stays constant however long the interview runs.
+    Rooms are evicted when they empty, after ROOM_CONTEXT_IDLE_TTL without
+    activity, or least recently used first beyond ROOM_CONTEXT_MAX_ROOMS.
+    Only touched from greenlets on the hub, so no locking is needed.
+    """
+
+    def __init__(self, decay: float = ROOM_CONTEXT_DECAY, max_rooms: int = ROOM_CONTEXT_MAX_ROOMS,
+                 idle_ttl: float = ROOM_CONTEXT_IDLE_TTL):
+        self.decay = decay
+        self.max_rooms = max_rooms
+        self.idle_ttl = idle_ttl
+        self._rooms: "OrderedDict[str, RoomContext]" = OrderedDict()
+        self.chars_received = 0
+        self.chars_embedded = 0
+        self.chunks_embedded = 0
+        self.reused = 0
+
+    def has_new_text(self, room_id: str, context: str) -> bool:
+        """Whether context holds conversation the room hasn't folded in yet"""
+        room = self._rooms.get(room_id)
+        return bool(new_text(room.tail if room is not None else '', context).strip())
+
+    def update(self, room_id: str, context: str, store) -> Optional[np.ndarray]:
+        """Fold any new text in context into the room's centroid and return it"""
+        if store is None or not room_id:
+            return None
+
+        room = self._rooms.get(room_id)
+        if room is None or room.fingerprint != store.fingerprint:
+            # New room, or the index was rebuilt with another model or backend
+            room = RoomContext(store.fingerprint)
+            self._rooms[room_id] = room
+        room.updated_at = time.monotonic()
+        self._rooms.move_to_end(room_id)
+        self._expire()
+
+        self.chars_received += len(context)
+        chunk = new_text(room.tail, context)
+
+        if not chunk.strip():
+            room.tail = context[-_TAIL_CHARS:]
+            self.reused += 1
+            return room.centroid
+
+        try:
+            vector = np.asarray(query_batcher.embed(store, chunk), dtype='float32')
+        except (SearchPoolBusy, SearchPoolTimeout) as e:
+            # Keep the old tail so the chunk is folded in on the next request
+            logger.warning(f"Room context update skipped: {str(e)}")
+            return room.centroid
+
+        room.tail = context[-_TAIL_CHARS:]
+        self.chars_embedded += len(chunk)
+        self.chunks_embedded += 1
+
+        # The room may have been evicted or reset while the chunk was embedded
+        if self._rooms.get(room_id) is not room:
+            return vector
+
+        if room.centroid is None:
+            centroid = vector
+        else:
+            centroid = self.decay * room.centroid + (1.0 - self.decay) * vector
+        norm = np.linalg.norm(centroid)
+        room.centroid = centroid / norm if norm else centroid
+        room.chunks += 1
+        return room.centroid
+
+    def evict(self, room_id: str):
+        self._rooms.pop(room_id, None)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._rooms:
+            room_id, room = next(iter(self._rooms.items()))
+            if len(self._rooms) <= self.max_rooms and room.updated_at >= cutoff:
+                break
+            del self._rooms[room_id]
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rooms': len(self._rooms),
+            'chunks_embedded': self.chunks_embedded,
+            'reused': self.reused,
+            'chars_received': self.chars_received,
+            'chars_embedded': self.chars_embedded
+        }
+
+
+# Shared per-room context state for next-question suggestions
+room_contexts = RoomContextStore()
@@ -0,0 +1,114 @@
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import gevent
+import gevent.monkey
+from gevent.threadpool import ThreadPool
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SEARCH_POOL_SIZE = int(os.getenv('SEARCH_POOL_SIZE', min(4, os.cpu_count() or 1)))
+SEARCH_QUEUE_SIZE = int(os.getenv('SEARCH_QUEUE_SIZE', 64))
+SEARCH_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', 2.0))
+# Threads for background maintenance (index syncs, reloads), kept apart from request traffic
+SEARCH_BACKGROUND_WORKERS = int(os.getenv('SEARCH_BACKGROUND_WORKERS', 1))
+
+
+class SearchPoolBusy(Exception):
+    """Raised when the pool's queue is full"""
+
+
+class SearchPoolTimeout(Exception):
+    """Raised when a call did not finish within its timeout"""
+
+
+class SearchPool:
+    """Native thread pool for CPU-bound embedding and FAISS work.
+
+    Under gevent the calling greenlet waits cooperatively on the result, so the
+    hub keeps serving other sockets while a transcript is being embedded. In a
+    process that has not been monkey patched (CLI tools, benchmarks) the caller
+    is already a native thread and the work simply runs inline.
+    """
+
+    def __init__(self, size: int = SEARCH_POOL_SIZE, max_queue: int = SEARCH_QUEUE_SIZE,
+                 timeout: float = SEARCH_TIMEOUT, background_workers: int = SEARCH_BACKGROUND_WORKERS):
+        self.size = size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.background_workers = max(1, background_workers)
+        self._pool: Optional[ThreadPool] = None
+        self._background: Optional[ThreadPool] = None
+        # Only ever touched from the hub's thread, so no lock is needed
+        self._pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @staticmethod
+    def cooperative() -> bool:
+        return gevent.monkey.is_module_patched('threading')
+
+    def _release(self, _result):
+        self._pending -= 1
+
+    def saturated(self) -> bool:
+        return self._pending >= self.max_queue
+
+    def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run func in the pool and wait for its result"""
+        if not self.cooperative():
+            return func(*args, **kwargs)
+
+        if self.saturated():
+            self.rejected += 1
+            raise SearchPoolBusy(f"Search pool queue is full ({self.max_queue} pending)")
+
+        if self._pool is None:
+            self._pool = ThreadPool(self.size)
+
+        self._pending += 1
+        self.submitted += 1
+        result = self._pool.spawn(func, *args, **kwargs)
+        # The slot is freed when the work really finishes, even if the caller
+        # has stopped waiting, so the queue bound stays honest
+        result.rawlink(self._release)
+
+        try:
+            return result.get(timeout=self.timeout if timeout is None else timeout)
+        except gevent.Timeout:
+            self.timeouts += 1
+            raise SearchPoolTimeout(f"Search did not finish within {timeout or self.timeout}s")
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs):
+        """Start background maintenance work (e.g. index updates) without waiting for it.
+
+        It runs on its own worker threads, so a long rebuild never occupies
+        the threads request searches need, and bypasses the queue bound and
+        timeout, which are meant for request traffic.
+        """
+        if not self.cooperative():
+            threading.Thread(target=func, args=args, kwargs=kwargs, daemon=True).start()
+            return
+
+        if self._background is None:
+            self._background = ThreadPool(self.background_workers)
+        self._background.spawn(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'background_workers': self.background_workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts
+        }
+
+
+# Shared pool for embedding and vector search
+search_pool = SearchPool()
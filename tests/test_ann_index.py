@@ -0,0 +1,59 @@
+import numpy as np
+import faiss
+import pytest
+
+from ann_index import build_index, remove_ids, search_params
+from vector_index import QuestionVectorIndex
+
+DIMENSION = 16
+
+
+def _corpus(count: int = 400):
+    rng = np.random.default_rng(0)
+    vectors = rng.random((count, DIMENSION), dtype='float32')
+    # Large, non-contiguous ids like the real question ids
+    ids = np.arange(1000, 1000 + count, dtype='int64') * 7919
+    return vectors, ids
+
+
+@pytest.mark.parametrize('spec', ['Flat', 'IVF8,Flat', 'IVF8,SQ8', 'HNSW16'])
+def test_remove_ids_keeps_ids_and_vectors_in_step(spec):
+    vectors, ids = _corpus()
+    index, used = build_index(spec, vectors, ids)
+    assert used == spec
+
+    removed = ids[[3, 50, 100, 200, 399]]
+    index = remove_ids(index, removed, used)
+    keep = ~np.isin(ids, removed)
+    assert index.ntotal == keep.sum()
+
+    # Every remaining vector still finds itself under its own id
+    _, labels = index.search(vectors[keep], 1, params=search_params(index, 1, nprobe=8))
+    assert np.array_equal(labels[:, 0], ids[keep])
+    assert not np.isin(labels, removed).any()
+
+    # reconstruct_n follows id_map order, which partitions and the question graph rely on
+    by_id = dict(zip(ids.tolist(), vectors))
+    mapped = faiss.vector_to_array(index.id_map)
+    expected = np.array([by_id[int(qid)] for qid in mapped])
+    assert np.allclose(index.index.reconstruct_n(0, index.ntotal), expected, atol=0.05)
+
+
+def test_vector_index_removal_on_ivf():
+    vectors, ids = _corpus()
+    index, _ = build_index('IVF8,Flat', vectors, ids)
+    questions = {int(qid): ('A' if row < 200 else 'B', f"question {row}") for row, qid in enumerate(ids)}
+    vector_index = QuestionVectorIndex(index, questions, {'key': 'test', 'index_type': 'IVF8,Flat'},
+                                       vectors=vectors)
+
+    removed = [int(qid) for qid in ids[[0, 1, 2, 250, 300]]]
+    with vector_index._update_lock:
+        assert vector_index._update([], removed, None)
+
+    keep = ~np.isin(ids, removed)
+    for role in (None, 'A', 'B'):
+        rows = keep.copy()
+        if role:
+            rows &= np.array([questions[int(qid)][0] == role for qid in ids])
+        hits = vector_index.search_vectors(vectors[rows], 1, role=role)
+        assert [found[0][0] for found in hits] == ids[rows].tolist()
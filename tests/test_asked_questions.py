@@ -0,0 +1,33 @@
+import asked_questions
+from asked_questions import AskedQuestionTracker
+
+
+def test_ordinal_table_stays_bounded_by_live_rooms(monkeypatch):
+    monkeypatch.setattr(asked_questions, '_COMPACT_MIN', 8)
+    tracker = AskedQuestionTracker(max_rooms=2)
+
+    # Many rooms come and go, each asked different questions
+    for room in range(100):
+        tracker.mark(f"room-{room}", [room * 10 + offset for offset in range(3)], current=True)
+
+    assert tracker.compactions > 0
+    # Only the two live rooms' ids (plus the growth allowed before compacting) are kept
+    assert len(tracker._ids) <= 2 * max(8, 6) + 3
+    assert tracker.excluded('room-99') == frozenset({990, 991, 992})
+    assert tracker.excluded('room-98') == frozenset({980, 981, 982})
+    assert tracker.current('room-99') == 992
+    assert tracker.excluded('room-0') == frozenset()
+
+
+def test_compaction_keeps_room_state():
+    tracker = AskedQuestionTracker()
+    tracker.mark('a', [1, 2, 3])
+    tracker.mark('b', [3, 4], current=True)
+    tracker.evict('a')
+    tracker._compact()
+
+    assert tracker.excluded('b') == frozenset({3, 4})
+    assert tracker.current('b') == 4
+    assert len(tracker._ids) == 2
+    tracker.mark('b', [3, 5])
+    assert tracker.excluded('b') == frozenset({3, 4, 5})
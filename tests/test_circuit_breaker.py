@@ -0,0 +1,56 @@
+import time
+
+from circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+
+def _tripped(open_seconds: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=open_seconds, max_open_seconds=1.0)
+    assert breaker.allow()
+    breaker.record_failure(breaker.generation)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_straggler_success_does_not_close_an_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=0.05, max_open_seconds=1.0)
+    assert breaker.allow()
+    straggler = breaker.generation
+    assert breaker.allow()
+    breaker.record_failure(breaker.generation)
+    assert breaker.state == OPEN
+
+    breaker.record_success(straggler)
+    assert breaker.state == OPEN
+    breaker.record_success()
+    assert breaker.state == OPEN
+
+    # Nor once it is half-open: only the trial decides
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success(straggler)
+    breaker.release(straggler)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_trial_closes_or_reopens():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure(breaker.generation)
+    assert breaker.state == OPEN
+
+    time.sleep(0.15)
+    assert breaker.allow()
+    breaker.record_success(breaker.generation)
+    assert breaker.state == CLOSED
+
+
+def test_released_trial_lets_the_next_caller_through():
+    breaker = _tripped()
+    time.sleep(0.06)
+    assert breaker.allow()
+    generation = breaker.generation
+    assert not breaker.allow()
+    breaker.release(generation)
+    assert breaker.allow()
@@ -0,0 +1,639 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+import traceback
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+import faiss
+
+from question_catalog import BASE_DIR, QUESTIONS_PATH, CatalogSnapshot, Question, QuestionCatalog, catalog as default_catalog
+from embedding_backends import BACKENDS, EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, embedding_fingerprint, load_embeddings
+from ann_index import (
+    VECTOR_FLAT_MAX, VECTOR_INDEX_MEMORY_MB, VECTOR_INDEX_TYPE,
+    build_index, choose_index_spec, remove_ids, search_params
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout changes so old artifacts are rebuilt
+INDEX_FORMAT_VERSION = 2
+
+INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', os.path.join(BASE_DIR, 'data', 'vector_index'))
+
+INDEX_FILE = 'index.faiss'
+META_FILE = 'meta.json'
+PARTITION_FILE = 'partition-{}.faiss'
+
+# The global index and the role partitions each get half the memory budget
+_INDEX_BUDGET = VECTOR_INDEX_MEMORY_MB * 2 ** 20 / 2
+
+# What a role-scoped search does when the role's partition has fewer than k hits:
+#   'fill'   - top up from the global index (skipping questions already returned)
+#   'strict' - return only the role's questions
+# Unknown roles always search the global index.
+ROLE_FALLBACK = os.getenv('VECTOR_ROLE_FALLBACK', 'fill')
+
+
+def artifact_key(questions_sha256: str, fingerprint: str) -> str:
+    """Artifact directory name for given catalog contents and embedding fingerprint"""
+    raw = f"v{INDEX_FORMAT_VERSION}\x1f{fingerprint}\x1f{questions_sha256}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _as_matrix(vectors) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(vectors, dtype='float32'))
+
+
+class _IndexState:
+    """One consistent version of the global index, its role partitions and question metadata"""
+
+    __slots__ = ('index', 'partitions', 'questions', 'meta')
+
+    def __init__(self, index, partitions: Dict[str, faiss.Index], questions: Dict[int, Tuple[str, str]], meta: dict):
+        self.index = index
+        self.partitions = partitions
+        self.questions = questions  # id -> (role, text)
+        self.meta = meta
+
+
+def _read_index(path: str):
+    try:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Not every index type can be memory-mapped
+        return faiss.read_index(path)
+
+    # Memory-mapped IVF lists can't be cloned, which incremental updates need
+    if isinstance(faiss.downcast_index(index.index), faiss.IndexIVF):
+        return faiss.read_index(path)
+    return index
+
+
+def _partition_spec(count: int, total: int, dimension: int) -> str:
+    """Index type for a role partition, with a share of the budget proportional to its size"""
+    index_type = VECTOR_INDEX_TYPE if count > VECTOR_FLAT_MAX else 'auto'
+    return choose_index_spec(count, dimension, _INDEX_BUDGET * count / max(total, 1), index_type)
+
+
+class QuestionVectorIndex:
+    """FAISS index over catalog questions, addressed by stable question ids.
+
+    Searches read a single immutable _IndexState, and updates build a new
+    state and publish it with one assignment, so a search running in a pool
+    thread never sees a half-applied change.
+    """
+
+    def __init__(self, index, questions: Dict[int, Tuple[str, str]], meta: dict, embeddings=None,
+                 partitions: Optional[Dict[str, faiss.Index]] = None, vectors: Optional[np.ndarray] = None):
+        self.catalog_version = None
+        if partitions is None:
+            partitions, partition_types = self._partition(index, questions, vectors)
+            meta = dict(meta, partition_types=partition_types)
+        self._state = _IndexState(index, partitions, questions, meta)
+        self._update_lock = threading.Lock()
+        self._private = False
+        self.embeddings = embeddings
+
+    @property
+    def embeddings(self):
+        return self._embeddings
+
+    @embeddings.setter
+    def embeddings(self, embeddings):
+        # Vectors from another backend or model live in a different space;
+        # querying with them would silently return poor matches
+        fingerprint = getattr(embeddings, 'fingerprint', None)
+        if fingerprint is not None and fingerprint != self.fingerprint:
+            raise ValueError(f"Embeddings '{fingerprint}' do not match the index's '{self.fingerprint}'")
+        self._embeddings = embeddings
+
+    @property
+    def index(self):
+        return self._state.index
+
+    @property
+    def partitions(self) -> Dict[str, faiss.Index]:
+        return self._state.partitions
+
+    @property
+    def questions(self) -> Dict[int, Tuple[str, str]]:
+        return self._state.questions
+
+    @property
+    def meta(self) -> dict:
+        return self._state.meta
+
+    @property
+    def key(self) -> str:
+        return self.meta['key']
+
+    @property
+    def model_name(self) -> str:
+        return self.meta['model_name']
+
+    @property
+    def fingerprint(self) -> str:
+        # Artifacts written before backends were configurable are torch ones
+        return self.meta.get('embedding_fingerprint', self.meta['model_name'])
+
+    @property
+    def dimension(self) -> int:
+        return self.index.d
+
+    @property
+    def index_type(self) -> str:
+        return self.meta.get('index_type', 'Flat')
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @classmethod
+    def build(cls, snapshot: CatalogSnapshot, embeddings, meta: dict) -> 'QuestionVectorIndex':
+        """Embed every catalog question and build an L2 index keyed by question id.
+
+        The index type (exact, HNSW or IVF with quantization) is chosen by
+        choose_index_spec from the corpus size and memory budget.
+        """
+        questions = list(snapshot.by_id.values())
+        if not questions:
+            raise ValueError("No valid questions found in questions.json")
+
+        vectors = _as_matrix(embeddings.embed_documents([q.text for q in questions]))
+        ids = np.array([q.id for q in questions], dtype='int64')
+
+        requested = choose_index_spec(len(questions), vectors.shape[1], _INDEX_BUDGET)
+        index, index_type = build_index(requested, vectors, ids)
+
+        meta = dict(meta, dimension=int(vectors.shape[1]), count=len(questions), created_at=time.time(),
+                    index_type=index_type, index_type_requested=requested)
+        vector_index = cls(index, {q.id: (q.role, q.text) for q in questions}, meta, embeddings, vectors=vectors)
+        vector_index.catalog_version = snapshot.version
+        return vector_index
+
+    def save(self, directory: str = INDEX_DIR) -> str:
+        """Write the artifact atomically to <directory>/<key>"""
+        state = self._state
+        key = state.meta['key']
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, key)
+        staging = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        faiss.write_index(state.index, os.path.join(staging, INDEX_FILE))
+        # Partitions are saved too, so loading never re-trains or re-links them
+        partition_files = {}
+        for number, (role, partition) in enumerate(state.partitions.items()):
+            partition_files[role] = PARTITION_FILE.format(number)
+            faiss.write_index(partition, os.path.join(staging, partition_files[role]))
+
+        meta = dict(state.meta, partition_files=partition_files,
+                    questions=[[qid, role, text] for qid, (role, text) in state.questions.items()])
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+
+        # Drop artifacts this one supersedes: older question files with the
+        # same embeddings. Other models' artifacts may still be in use by
+        # another process, so they are left alone
+        saved_at = state.meta.get('updated_at') or state.meta.get('created_at') or 0
+        for updated_at, name in _artifacts(directory, self.fingerprint):
+            if name != key and updated_at <= saved_at:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        logger.info(f"Vector index artifact saved to {target}")
+        return target
+
+    @classmethod
+    def load(cls, key: str, directory: str = INDEX_DIR, embeddings=None) -> Optional['QuestionVectorIndex']:
+        """Load the artifact for key, memory-mapping the FAISS index when supported"""
+        path = os.path.join(directory, key)
+        index_path = os.path.join(path, INDEX_FILE)
+        meta_path = os.path.join(path, META_FILE)
+        if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('format_version') != INDEX_FORMAT_VERSION or meta.get('key') != key:
+                logger.warning(f"Ignoring incompatible vector index artifact at {path}")
+                return None
+
+            index = _read_index(index_path)
+
+            questions = {int(qid): (role, text) for qid, role, text in meta.pop('questions')}
+            if index.ntotal != len(questions):
+                logger.warning(f"Vector index artifact at {path} is inconsistent, rebuilding")
+                return None
+
+            # Artifacts from before partitions were persisted rebuild them instead
+            partitions = None
+            partition_files = meta.pop('partition_files', None)
+            if partition_files is not None and 'partition_types' in meta:
+                partitions = {role: _read_index(os.path.join(path, name)) for role, name in partition_files.items()}
+                if sum(partition.ntotal for partition in partitions.values()) != index.ntotal:
+                    logger.warning(f"Vector index partitions at {path} are inconsistent, rebuilding them")
+                    partitions = None
+
+            logger.info(f"Vector index loaded from {path} ({index.ntotal} questions, {meta.get('index_type', 'Flat')})")
+            return cls(index, questions, meta, embeddings, partitions)
+
+        except Exception as e:
+            logger.error(f"Error loading vector index artifact: {e}")
+            return None
+
+    @staticmethod
+    def _partition(index, questions: Dict[int, Tuple[str, str]],
+                   vectors: Optional[np.ndarray] = None) -> Tuple[Dict[str, faiss.Index], Dict[str, str]]:
+        """Split the global index into one sub-index per role.
+
+        vectors, if given, are the global index's vectors in id_map order;
+        otherwise they are reconstructed from the index (approximately, for
+        quantized indexes). Returns the partitions and their index types.
+        """
+        total = index.ntotal
+        if total == 0:
+            return {}, {}
+
+        ids = faiss.vector_to_array(index.id_map)
+        if vectors is None:
+            vectors = index.index.reconstruct_n(0, total)
+        roles = np.array([questions[int(qid)][0] for qid in ids], dtype=object)
+
+        partitions = {}
+        partition_types = {}
+        for role in dict.fromkeys(roles):
+            mask = roles == role
+            spec = _partition_spec(int(mask.sum()), total, vectors.shape[1])
+            partitions[role], partition_types[role] = build_index(spec, np.ascontiguousarray(vectors[mask]), ids[mask])
+        return partitions, partition_types
+
+    def reindexed(self, spec: str) -> 'QuestionVectorIndex':
+        """A copy of this index rebuilt as another index type, without re-embedding"""
+        state = self._state
+        ids = faiss.vector_to_array(state.index.id_map)
+        vectors = _as_matrix(state.index.index.reconstruct_n(0, state.index.ntotal))
+        index, index_type = build_index(spec, vectors, ids)
+        meta = dict(state.meta, index_type=index_type, index_type_requested=spec, updated_at=time.time())
+        vector_index = QuestionVectorIndex(index, dict(state.questions), meta, self.embeddings, vectors=vectors)
+        vector_index.catalog_version = self.catalog_version
+        return vector_index
+
+    def diff(self, snapshot: CatalogSnapshot) -> Tuple[List[Question], List[int]]:
+        """Questions to add and question ids to remove to match a catalog snapshot"""
+        questions = self.questions
+        added = [q for qid, q in snapshot.by_id.items() if qid not in questions]
+        removed = [qid for qid in questions if qid not in snapshot.by_id]
+        return added, removed
+
+    def apply_changes(self, snapshot: CatalogSnapshot, questions_sha256: Optional[str] = None) -> bool:
+        """Bring the index in line with snapshot, embedding only new or edited questions.
+
+        An edited question has a new id, so it is removed and re-added. Returns
+        True if anything changed. Safe to call concurrently with searches.
+        """
+        with self._update_lock:
+            added, removed = self.diff(snapshot)
+            changed = self._update(added, removed, questions_sha256)
+            self.catalog_version = snapshot.version
+        if changed:
+            logger.info(f"Vector index updated: {len(added)} added, {len(removed)} removed")
+        return changed
+
+    def detach(self):
+        """Take private, writable copies of the index and partitions for in-place updates.
+
+        Only for an index nothing else is searching, e.g. one owned by a bulk
+        ingestion run: afterwards add_questions(..., in_place=True) grows it
+        without copying the whole index for every chunk.
+        """
+        with self._update_lock:
+            state = self._state
+            partitions = {role: faiss.clone_index(partition) for role, partition in state.partitions.items()}
+            self._state = _IndexState(faiss.clone_index(state.index), partitions, dict(state.questions),
+                                      dict(state.meta))
+            self._private = True
+
+    def add_questions(self, questions: Sequence[Question], questions_sha256: Optional[str] = None,
+                      vectors: Optional[np.ndarray] = None, in_place: bool = False) -> int:
+        """Add questions not already indexed, embedding them unless vectors are given.
+
+        Used by bulk ingestion, which adds a chunk at a time without diffing
+        the whole catalog. in_place adds to the current index instead of a
+        copy, and requires detach() first. Returns how many questions were added.
+        """
+        if in_place and not self._private:
+            raise ValueError("In-place updates need a detached index")
+        with self._update_lock:
+            current = self.questions
+            rows = [row for row, q in enumerate(questions) if q.id not in current]
+            rows = list({questions[row].id: row for row in rows}.values())
+            added = [questions[row] for row in rows]
+            if vectors is not None:
+                vectors = np.ascontiguousarray(vectors[rows])
+            self._update(added, [], questions_sha256, vectors, in_place)
+        return len(added)
+
+    def _update(self, added: List[Question], removed: List[int], questions_sha256: Optional[str],
+                vectors: Optional[np.ndarray] = None, in_place: bool = False) -> bool:
+        """Publish a new state with added and removed questions; caller holds _update_lock"""
+        state = self._state
+        meta = dict(state.meta)
+        if questions_sha256:
+            meta['questions_sha256'] = questions_sha256
+            meta['key'] = artifact_key(questions_sha256, self.fingerprint)
+
+        if not added and not removed:
+            self._state = _IndexState(state.index, state.partitions, state.questions, meta)
+            return False
+
+        # Work on copies; the mmapped original may be read-only and is
+        # still being searched (unless the index is detached and updated in place)
+        index = state.index if in_place else faiss.clone_index(state.index)
+        partitions = state.partitions if in_place else dict(state.partitions)
+        partition_types = dict(meta.get('partition_types') or {})
+        questions = state.questions if in_place else dict(state.questions)
+        touched = {}
+
+        if removed:
+            index = remove_ids(index, removed, self.index_type)
+            for qid in removed:
+                role, _ = questions.pop(qid)
+                touched.setdefault(role, ([], []))[0].append(qid)
+
+        if added:
+            if vectors is None:
+                vectors = _as_matrix(self.embeddings.embed_documents([q.text for q in added]))
+            index.add_with_ids(vectors, np.array([q.id for q in added], dtype='int64'))
+            for row, question in enumerate(added):
+                questions[question.id] = (question.role, question.text)
+                touched.setdefault(question.role, ([], []))[1].append(row)
+
+        for role, (role_removed, role_added) in touched.items():
+            role_vectors = np.ascontiguousarray(vectors[role_added]) if role_added else None
+            role_ids = np.array([added[row].id for row in role_added], dtype='int64')
+            partition = partitions.get(role)
+            if partition is None:
+                spec = _partition_spec(len(role_added), index.ntotal, index.d)
+                partition, partition_types[role] = build_index(spec, role_vectors, role_ids)
+            else:
+                if not in_place:
+                    partition = faiss.clone_index(partition)
+                if role_removed:
+                    partition = remove_ids(partition, role_removed, partition_types.get(role, 'Flat'))
+                if role_added:
+                    partition.add_with_ids(role_vectors, role_ids)
+            if partition.ntotal:
+                partitions[role] = partition
+            else:
+                partitions.pop(role, None)
+                partition_types.pop(role, None)
+
+        meta['partition_types'] = partition_types
+        meta['count'] = index.ntotal
+        meta['updated_at'] = time.time()
+        self._state = _IndexState(index, partitions, questions, meta)
+        return True
+
+    def sync(self, catalog: QuestionCatalog = default_catalog, directory: Optional[str] = INDEX_DIR) -> bool:
+        """Apply any catalog changes since the last sync and persist the result.
+
+        If another process (e.g. ingest.py) already wrote the artifact for the
+        new catalog contents, it is loaded instead of re-embedding the changes.
+        """
+        snapshot = catalog.snapshot()
+        if snapshot is None or snapshot.version == self.catalog_version:
+            return False
+
+        questions_sha256 = catalog.content_sha256()
+        key = artifact_key(questions_sha256, self.fingerprint)
+        if directory and key != self.key:
+            adopted = QuestionVectorIndex.load(key, directory)
+            if adopted is not None:
+                with self._update_lock:
+                    self._state = adopted._state
+                    self.catalog_version = snapshot.version
+                return True
+
+        changed = self.apply_changes(snapshot, questions_sha256)
+        if directory:
+            try:
+                self.save(directory)
+            except Exception as e:
+                logger.error(f"Error saving vector index artifact: {e}")
+        return changed
+
+    @staticmethod
+    def _search(index, vectors: np.ndarray, k: int,
+                exclude: FrozenSet[int] = frozenset()) -> List[List[Tuple[int, float]]]:
+        if index.ntotal == 0:
+            return [[] for _ in range(len(vectors))]
+        k = min(k, index.ntotal)
+        distances, ids = index.search(vectors, k, params=search_params(index, k, exclude))
+        return [
+            [(int(qid), float(dist)) for qid, dist in zip(row_ids, row_dist) if qid != -1]
+            for row_ids, row_dist in zip(ids, distances)
+        ]
+
+    def search_vectors(self, vectors, k: int, role: Optional[str] = None,
+                       exclude: FrozenSet[int] = frozenset()) -> List[List[Tuple[int, float]]]:
+        """Batched top-k search returning (question id, distance) pairs per query.
+
+        Ids in exclude (e.g. questions already asked in a room) are skipped
+        during the search itself, so k fresh hits come back without over-fetching.
+        """
+        state = self._state
+        vectors = _as_matrix(vectors)
+        partition = state.partitions.get(role) if role else None
+        if partition is None:
+            return self._search(state.index, vectors, k, exclude)
+
+        results = self._search(partition, vectors, k, exclude)
+        short = [i for i, hits in enumerate(results) if len(hits) < k]
+        if not short or ROLE_FALLBACK == 'strict':
+            return results
+
+        # Top up short results from the global index, skipping questions (or
+        # identical texts filed under other roles) that were already returned
+        extra = self._search(state.index, vectors[short], k * 2, exclude)
+        for i, global_hits in zip(short, extra):
+            seen = {state.questions[qid][1] for qid, _ in results[i]}
+            for qid, dist in global_hits:
+                if len(results[i]) >= k:
+                    break
+                text = state.questions[qid][1]
+                if text not in seen:
+                    seen.add(text)
+                    results[i].append((qid, dist))
+        return results
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of query texts in one forward pass"""
+        return _as_matrix(self.embeddings.embed_documents(list(texts)))
+
+    def search(self, text: str, k: int = 3, role: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Top-k question ids for text, searching only the role's partition when possible"""
+        return self.search_vectors(self.embed_texts([text]), k, role)[0]
+
+    def text(self, qid: int) -> str:
+        return self.questions[qid][1]
+
+
+def _artifacts(directory: str, fingerprint: str) -> List[Tuple[float, str]]:
+    """(last update time, name) of each artifact built with the same embeddings and format"""
+    if not os.path.isdir(directory):
+        return []
+
+    candidates = []
+    for name in os.listdir(directory):
+        meta_path = os.path.join(directory, name, META_FILE)
+        if '.tmp-' in name or not os.path.exists(meta_path):
+            continue
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            continue
+        if (meta.get('format_version') == INDEX_FORMAT_VERSION
+                and meta.get('embedding_fingerprint', meta.get('model_name')) == fingerprint):
+            candidates.append((meta.get('updated_at') or meta.get('created_at') or 0, name))
+    return candidates
+
+
+def _find_reusable_artifact(directory: str, fingerprint: str) -> Optional[str]:
+    """Most recent artifact built with the same embeddings and format, if any"""
+    candidates = _artifacts(directory, fingerprint)
+    return max(candidates)[1] if candidates else None
+
+
+def _reindex_if_needed(index: QuestionVectorIndex) -> QuestionVectorIndex:
+    """Rebuild a loaded index whose type no longer suits its size or the configuration"""
+    spec = choose_index_spec(len(index), index.dimension, _INDEX_BUDGET)
+    if index.meta.get('index_type_requested', 'Flat') == spec:
+        return index
+    logger.info(f"Re-indexing {len(index)} questions from {index.index_type} to {spec}")
+    return index.reindexed(spec)
+
+
+def _save_artifact(index: QuestionVectorIndex, directory: str):
+    try:
+        index.save(directory)
+    except Exception as e:
+        # A read-only deployment can still serve from the in-memory index
+        logger.error(f"Error saving vector index artifact: {e}")
+
+
+def get_question_index(
+    embeddings=None,
+    catalog: QuestionCatalog = default_catalog,
+    directory: str = INDEX_DIR,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    force_rebuild: bool = False,
+    backend: str = EMBEDDING_BACKEND
+) -> Optional[QuestionVectorIndex]:
+    """Load the persisted index for the current question file, building it only if needed.
+
+    If the question file changed since the artifact was written, the previous
+    artifact is loaded and updated incrementally instead of re-embedding
+    every question. Artifacts are keyed by the embedding fingerprint, so
+    switching backend or model builds (or finds) a separate artifact. An
+    artifact whose index type no longer fits is re-indexed from its stored
+    vectors rather than re-embedded.
+    """
+    if not os.path.exists(catalog.path):
+        logger.error("questions.json file not found")
+        return None
+
+    # Loaded embeddings know their own fingerprint (e.g. a custom backend)
+    fingerprint = getattr(embeddings, 'fingerprint', None) or embedding_fingerprint(model_name, backend)
+    questions_sha256 = catalog.content_sha256()
+    key = artifact_key(questions_sha256, fingerprint)
+
+    snapshot = catalog.snapshot()
+    if snapshot is None:
+        return None
+
+    if not force_rebuild:
+        index = QuestionVectorIndex.load(key, directory, embeddings)
+        if index is not None:
+            index.catalog_version = snapshot.version
+            reindexed = _reindex_if_needed(index)
+            if reindexed is not index:
+                _save_artifact(reindexed, directory)
+            return reindexed
+
+        previous = _find_reusable_artifact(directory, fingerprint)
+        index = QuestionVectorIndex.load(previous, directory) if previous else None
+        if index is not None:
+            if embeddings is None:
+                embeddings = load_embeddings(model_name, backend)
+            index.embeddings = embeddings
+            index.apply_changes(snapshot, questions_sha256)
+            index = _reindex_if_needed(index)
+            _save_artifact(index, directory)
+            return index
+
+    if embeddings is None:
+        embeddings = load_embeddings(model_name, backend)
+
+    logger.info(f"Building vector index for {len(snapshot)} questions with {fingerprint}")
+    meta = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'key': key,
+        'model_name': model_name,
+        'embedding_backend': getattr(embeddings, 'backend', backend),
+        'embedding_fingerprint': fingerprint,
+        'questions_sha256': questions_sha256,
+    }
+    index = QuestionVectorIndex.build(snapshot, embeddings, meta)
+    _save_artifact(index, directory)
+    return index
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the persisted question vector index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Prebuild the index artifact (e.g. at deploy time)")
+    build_parser.add_argument('--questions', default=QUESTIONS_PATH, help="Path to questions.json")
+    build_parser.add_argument('--output', default=INDEX_DIR, help="Artifact directory")
+    build_parser.add_argument('--model', default=EMBEDDING_MODEL_NAME, help="Embedding model name")
+    build_parser.add_argument('--backend', default=EMBEDDING_BACKEND, choices=BACKENDS, help="Embedding backend")
+    build_parser.add_argument('--force', action='store_true', help="Rebuild even if an artifact exists")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        started = time.perf_counter()
+        index = get_question_index(
+            catalog=QuestionCatalog(args.questions),
+            directory=args.output,
+            model_name=args.model,
+            force_rebuild=args.force,
+            backend=args.backend
+        )
+        if index is None:
+            return 1
+        print(f"Vector index {index.key} ({index.index_type}) ready with {len(index)} questions "
+              f"in {time.perf_counter() - started:.1f}s")
+        return 0
+    except Exception as e:
+        logger.error(f"Error building vector index: {e}")
+        logger.error(traceback.format_exc())
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())